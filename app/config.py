@@ -35,6 +35,24 @@ class Settings:
     duckdb_path: Path
     cnpj_month: str
     nextcloud_public_token: str
+    download_workers: int = 2
+    download_priority: str = "largest"
+    download_adaptive: bool = False
+    download_segments: int = 4
+    download_min_segment: int = 64
+    download_rate_limit: str = ""
+    download_rate_schedule: str = ""
+    zip_cache_dir: Path | None = None
+    download_log: Path | None = None
+    finder_state: Path | None = None
+    finder_deep_listing: bool = False
+    disk_expansion_ratio: float = 4.0
+    disk_db_ratio: float = 1.0
+    disk_cleanup: bool = False
+    backfill_workers: int = 2
+    extract_processes: int = 1
+    load_source: str = "extracted"
+    extract_parquet: bool = False
 
     # ----------------------------------------------------
     # Derived paths
@@ -83,9 +101,123 @@ def get_settings() -> Settings:
             "NEXTCLOUD_PUBLIC_TOKEN environment variable is required"
         )
 
+    # Parallel file downloads (upper bound when adaptive)
+    download_workers: int = int(os.getenv("DOWNLOAD_WORKERS", "2"))
+
+    # Download order: "largest" first (default) or "dimensions" first
+    download_priority: str = os.getenv(
+        "DOWNLOAD_PRIORITY", "largest"
+    ).strip()
+
+    if download_priority not in ("largest", "dimensions"):
+        raise RuntimeError(
+            f"Invalid DOWNLOAD_PRIORITY: {download_priority}"
+        )
+
+    # AIMD concurrency control for downloads
+    download_adaptive: bool = (
+        os.getenv("DOWNLOAD_ADAPTIVE", "").strip().lower()
+        in ("1", "true", "yes")
+    )
+
+    # Byte-range segments per large file (1 disables segmenting), and
+    # the smallest segment worth its own connection, in MiB
+    download_segments: int = int(os.getenv("DOWNLOAD_SEGMENTS", "4"))
+    download_min_segment: int = int(
+        os.getenv("DOWNLOAD_MIN_SEGMENT", "64")
+    )
+
+    if download_segments < 1 or download_min_segment < 1:
+        raise RuntimeError(
+            "DOWNLOAD_SEGMENTS and DOWNLOAD_MIN_SEGMENT must be positive"
+        )
+
+    # Shared download bandwidth, e.g. "20M" (bytes/s, K/M/G suffixes)
+    download_rate_limit: str = os.getenv("DOWNLOAD_RATE_LIMIT", "").strip()
+
+    # Time-of-day overrides, e.g. "08:00-18:00=5M,18:00-08:00=0"
+    download_rate_schedule: str = os.getenv(
+        "DOWNLOAD_RATE_SCHEDULE", ""
+    ).strip()
+
+    # Shared content-addressed ZIP cache (local dir or mounted path)
+    zip_cache_env: str = os.getenv("ZIP_CACHE_DIR", "").strip()
+    zip_cache_dir: Path | None = (
+        Path(zip_cache_env).resolve() if zip_cache_env else None
+    )
+
+    # JSONL log of per-file download telemetry
+    download_log: Path = Path(
+        os.getenv("DOWNLOAD_LOG", str(data_dir / "logs/downloads.jsonl"))
+    ).resolve()
+
+    # Finder change-detection state; empty falls back to the time window
+    finder_state_env: str = os.getenv(
+        "FINDER_STATE", str(data_dir / "state/finder.json")
+    ).strip()
+    finder_state: Path | None = (
+        Path(finder_state_env).resolve() if finder_state_env else None
+    )
+
+    # List months and files in one Depth: infinity PROPFIND
+    finder_deep_listing: bool = (
+        os.getenv("FINDER_DEEP_LISTING", "").strip().lower()
+        in ("1", "true", "yes")
+    )
+
+    # Disk preflight: CSV bytes and DuckDB growth per ZIP byte
+    disk_expansion_ratio: float = float(
+        os.getenv("DISK_EXPANSION_RATIO", "4.0")
+    )
+    disk_db_ratio: float = float(os.getenv("DISK_DB_RATIO", "1.0"))
+
+    # Delete ZIPs and CSVs once their data is loaded into DuckDB
+    disk_cleanup: bool = (
+        os.getenv("DISK_CLEANUP", "").strip().lower()
+        in ("1", "true", "yes")
+    )
+
+    # Backfill: months downloaded concurrently
+    backfill_workers: int = int(os.getenv("BACKFILL_WORKERS", "2"))
+
+    # Worker processes inflating a month's ZIPs in parallel (1 = serial)
+    extract_processes: int = int(os.getenv("EXTRACT_PROCESSES", "1"))
+
+    # Transcode extracted CSVs to Parquet (ZSTD, UTF-8)
+    extract_parquet: bool = (
+        os.getenv("EXTRACT_PARQUET", "").strip().lower()
+        in ("1", "true", "yes")
+    )
+
+    # Load from "extracted" CSVs (default) or straight from the "zip" files
+    load_source: str = os.getenv("LOAD_SOURCE", "extracted").strip()
+
+    if load_source not in ("extracted", "zip"):
+        raise RuntimeError(
+            f"Invalid LOAD_SOURCE: {load_source}"
+        )
+
     return Settings(
         data_dir=data_dir,
         duckdb_path=duckdb_path,
         cnpj_month=cnpj_month,
         nextcloud_public_token=nextcloud_public_token,
+        download_workers=download_workers,
+        download_priority=download_priority,
+        download_adaptive=download_adaptive,
+        download_segments=download_segments,
+        download_min_segment=download_min_segment,
+        download_rate_limit=download_rate_limit,
+        download_rate_schedule=download_rate_schedule,
+        zip_cache_dir=zip_cache_dir,
+        download_log=download_log,
+        finder_state=finder_state,
+        finder_deep_listing=finder_deep_listing,
+        disk_expansion_ratio=disk_expansion_ratio,
+        disk_db_ratio=disk_db_ratio,
+        disk_cleanup=disk_cleanup,
+        backfill_workers=backfill_workers,
+        extract_processes=extract_processes,
+        extract_parquet=extract_parquet,
+        load_source=load_source,
     )
@@ -0,0 +1,266 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+import json
+import os
+
+from app.pipeline.disk import DiskGuard
+from app.pipeline.download import CNPJDownloader
+from app.pipeline.extract import CNPJExtractor, ExtractResult
+from app.pipeline.manifest import MonthManifest
+from app.pipeline.warehouse import CNPJWarehouse
+from app.orchestrator.find import CNPJMonthFinder
+
+
+def month_range(start: str, end: str) -> list[str]:
+    """
+    All YYYY-MM months from start to end, inclusive.
+    """
+    year, month = (int(part) for part in start.split("-"))
+    end_year, end_month = (int(part) for part in end.split("-"))
+
+    months: list[str] = []
+
+    while (year, month) <= (end_year, end_month):
+        months.append(f"{year}-{month:02d}")
+
+        month += 1
+        if month == 13:
+            month = 1
+            year += 1
+
+    return months
+
+
+class CNPJBackfill:
+    """
+    Rebuild a range of historical months.
+
+    - Months are downloaded concurrently (month_workers at a time),
+      sharing the downloader's bandwidth limit.
+    - Each downloaded month is extracted right away, ZIPs spread over
+      the extractor's worker processes.
+    - Months are loaded strictly in order, since each load rebuilds
+      leads_current and appends that month's snapshot.
+    - If the warehouse held a newer month before the run, that month
+      is loaded again at the end, so leads_current and raw_source
+      are left on it rather than on the last historical month.
+
+    Downloads only run a few months ahead of loading, to bound disk
+    use. Each month in flight reserves its disk estimate, so the
+    preflight of the next one counts what the others still need.
+    Loaded months are recorded in a state file, so an interrupted
+    backfill resumes after the last loaded month; partial downloads
+    and unchanged extractions are reused as in a normal run.
+    """
+
+    def __init__(
+        self,
+        downloader: CNPJDownloader,
+        extractor: CNPJExtractor,
+        warehouse: CNPJWarehouse,
+        finder: CNPJMonthFinder,
+        disk: DiskGuard,
+        state_path: Path,
+        month_workers: int = 2,
+    ) -> None:
+        self.downloader = downloader
+        self.extractor = extractor
+        self.warehouse = warehouse
+        self.finder = finder
+        self.disk = disk
+        self.state_path = state_path
+        self.month_workers = month_workers
+
+    # ----------------------------------------------------
+    # PUBLIC API
+    # ----------------------------------------------------
+
+    def run(self, start: str, end: str) -> None:
+        available = set(self.finder.available_months())
+        requested = month_range(start, end)
+
+        missing = [month for month in requested if month not in available]
+
+        if missing:
+            print(f"[BACKFILL] Not on WebDAV, skipped: {missing}")
+
+        state = self._read_state()
+        current = self.warehouse.loaded_month()
+        months: list[str] = []
+
+        for month in requested:
+            if month not in available:
+                continue
+
+            if self._is_done(state, month):
+                print(f"[BACKFILL] Month {month} already loaded, skipping")
+                continue
+
+            months.append(month)
+
+        if not months:
+            print("[BACKFILL] Nothing to do")
+            return
+
+        print(f"[BACKFILL] Months to process: {months}")
+
+        # Download this many months ahead of the month being loaded
+        lookahead = max(1, 2 * self.month_workers)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.month_workers) as threads:
+                futures: dict[str, Future] = {}
+                queue = iter(months)
+
+                def submit_next() -> None:
+                    month = next(queue, None)
+
+                    if month is not None:
+                        futures[month] = threads.submit(self._fetch, month)
+
+                for _ in range(lookahead):
+                    submit_next()
+
+                try:
+                    for month in months:
+                        futures.pop(month).result()
+
+                        self._load(month)
+                        self._mark_done(month)
+                        self.disk.release_month(month)
+                        self.disk.unreserve(month)
+
+                        submit_next()
+                except BaseException:
+                    for future in futures.values():
+                        future.cancel()
+                    raise
+        finally:
+            # After the pool has drained: no fetch can reserve anymore
+            for month in months:
+                self.disk.unreserve(month)
+
+        print(f"[BACKFILL] Loaded {len(months)} months")
+
+        if current is None or current <= months[-1]:
+            return
+
+        if current in available:
+            self._restore(current)
+        else:
+            print(
+                f"[BACKFILL] {current} is no longer on WebDAV; "
+                f"leads_current now reflects {months[-1]}"
+            )
+
+    # ----------------------------------------------------
+    # STAGES
+    # ----------------------------------------------------
+
+    def _fetch(self, month: str) -> ExtractResult | None:
+        """
+        Download and extract a month. A month whose extraction failed
+        (invalid ZIPs are removed) is downloaded and extracted again
+        once before giving up. Nothing is extracted when the warehouse
+        loads straight from the ZIPs.
+        """
+        self.disk.preflight(
+            month,
+            {
+                remote.name: remote.size
+                for remote in self.downloader.list_month(month)
+            },
+            reserve=True,
+        )
+
+        for attempt in (1, 2):
+            self.downloader.download_month(month)
+
+            if self.warehouse.source == "zip":
+                return None
+
+            result = self.extractor.extract_month(month)
+
+            if not result.failed_files:
+                return result
+
+            print(
+                f"[BACKFILL] {len(result.failed_files)} ZIPs failed to "
+                f"extract for {month} (attempt {attempt}/2)"
+            )
+
+        raise RuntimeError(f"[BACKFILL] Failed to extract month {month}")
+
+    def _restore(self, month: str) -> None:
+        """
+        Rebuild leads_current and raw_source from the month they held
+        before the backfill. Its snapshot is already in leads.
+        """
+        print(f"[BACKFILL] Restoring {month} as the current month")
+
+        try:
+            self._fetch(month)
+            self._load(month)
+            self.disk.release_month(month)
+        finally:
+            self.disk.unreserve(month)
+
+    def _load(self, month: str) -> None:
+        print(f"[BACKFILL] Loading {month}")
+
+        self.warehouse.load_raw(month)
+        self.warehouse.load_dim(month)
+        self.warehouse.build_leads(month)
+
+        self.warehouse.mark_loaded(month, self._source_digest(month))
+
+    # ----------------------------------------------------
+    # STATE FILE
+    # ----------------------------------------------------
+
+    def _source_digest(self, month: str) -> str | None:
+        return MonthManifest(self.downloader.raw_dir / month).month_digest()
+
+    def _is_done(self, state: dict, month: str) -> bool:
+        entry = state.get(month)
+
+        return (
+            entry is not None
+            and entry.get("source_digest") is not None
+            and entry["source_digest"] == self._source_digest(month)
+        )
+
+    def _mark_done(self, month: str) -> None:
+        state = self._read_state()
+        state[month] = {
+            "source_digest": self._source_digest(month),
+            "loaded_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self._save_state(state)
+
+    def _read_state(self) -> dict[str, dict]:
+        if not self.state_path.exists():
+            return {}
+
+        try:
+            with self.state_path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            print(f"[BACKFILL] Ignoring unreadable {self.state_path}")
+            return {}
+
+        return data if isinstance(data, dict) else {}
+
+    def _save_state(self, state: dict[str, dict]) -> None:
+        """
+        Write the state file atomically.
+        """
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = self.state_path.with_name(f"{self.state_path.name}.tmp")
+
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+
+        os.replace(tmp_path, self.state_path)
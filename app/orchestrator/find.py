@@ -1,13 +1,46 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
 import base64
+import json
+import os
+import urllib.error
 import urllib.request
 import xml.etree.ElementTree as ET
 
+from app.pipeline.datasets import dataset_for_zip
+from app.pipeline.download import RemoteZip
+from app.pipeline.retry import RETRYABLE_ERRORS, RetryPolicy
+from app.pipeline.webdav import DavEntry, iter_propfind, propfind_body
+
+
+# Props requested for files: enough to detect changes and plan sizes
+FILE_PROPS = ("getlastmodified", "getetag", "getcontentlength")
+
+
+@dataclass(frozen=True)
+class MonthFolder:
+    """
+    Monthly folder listed by WebDAV PROPFIND.
+    """
+    name: str
+    last_modified: datetime
+    etag: str | None = None
+
 
 class CNPJMonthFinder:
     """
     Finder for CNPJ monthly folders on WebDAV.
-    Identifies months updated within a given time window.
+
+    Without a state file, months updated within a time window are
+    returned. With one, the finder remembers the folder and per-file
+    ETag / last-modified of every month processed successfully and
+    returns exactly the months whose content changed since.
+
+    With deep_listing, folders and their files come from a single
+    "Depth: infinity" PROPFIND, and the file listings are handed to
+    the downloader so it does not list each month again. Servers that
+    refuse infinite depth fall back to one listing per folder.
     """
 
     WEBDAV_BASE = "https://dados-hom.receitafederal.gov.br/public.php/webdav"
@@ -16,34 +49,221 @@ class CNPJMonthFinder:
         self,
         public_token: str,
         days_window: int = 15,
+        retry_policy: RetryPolicy | None = None,
+        state_path: Path | None = None,
+        deep_listing: bool = False,
     ) -> None:
         self.public_token = public_token
         self.days_window = days_window
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=5)
+        self.state_path = state_path
+        self.deep_listing = deep_listing
+
+        # Listings seen by the last get_updated_months call
+        self._folders: dict[str, MonthFolder] = {}
+        self._files: dict[str, dict[str, dict]] = {}
+
+        # Per-month files from the last Depth: infinity listing
+        self._tree_files: dict[str, dict[str, dict]] = {}
 
     # ----------------------------------------------------
     # PUBLIC API
     # ----------------------------------------------------
 
-    def get_updated_months(self) -> list[str]:
+    def get_updated_months(self, read_only: bool = False) -> list[str]:
         """
-        Return list of YYYY-MM months updated within the time window.
+        Return list of YYYY-MM months to process.
+
+        read_only leaves the state file untouched (no baselines, no
+        folder updates), for dry runs such as plan.
         """
         print("[WATCHER] Checking updated months")
 
-        cutoff = self._cutoff_datetime()
-        months = self._list_month_folders()
+        self._tree_files = {}
+        self._files = {}
 
-        updated: list[str] = []
+        self._folders = (
+            self._list_tree()
+            if self.deep_listing
+            else self._list_month_folders()
+        )
 
-        for month, last_modified in months.items():
-            if last_modified >= cutoff:
-                updated.append(month)
+        if self.state_path is None:
+            updated = self._months_in_window(self._folders)
+        else:
+            updated = self._changed_months(self._folders, read_only)
 
         updated.sort()
 
         print(f"[WATCHER] {len(updated)} months updated")
         return updated
 
+    def available_months(self) -> list[str]:
+        """
+        All YYYY-MM folders currently on WebDAV.
+        """
+        return sorted(self._list_month_folders())
+
+    def month_listing(self, month: str) -> list[RemoteZip] | None:
+        """
+        Relevant ZIPs of a month as already listed by the finder,
+        or None if this run did not list them.
+        """
+        files = self._files.get(month) or self._tree_files.get(month)
+
+        if not files:
+            return None
+
+        return [
+            RemoteZip(
+                name=name,
+                size=entry["size"],
+                etag=entry["etag"],
+                last_modified=entry["last_modified"],
+            )
+            for name, entry in sorted(files.items())
+        ]
+
+    def mark_processed(self, month: str) -> None:
+        """
+        Remember a month as processed with the folder and file state
+        seen when it was found, so it is only returned again once its
+        content changes.
+        """
+        if self.state_path is None:
+            return
+
+        folder = self._folders.get(month)
+
+        if folder is None:
+            return
+
+        files = self._files.get(month)
+
+        if files is None:
+            files = self._list_month_files(month)
+
+        state = self._read_state()
+        state[month] = {
+            **self._folder_state(folder),
+            "files": files,
+            "processed_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self._save_state(state)
+
+        print(f"[WATCHER] Marked {month} as processed")
+
+    # ----------------------------------------------------
+    # CHANGE DETECTION
+    # ----------------------------------------------------
+
+    def _months_in_window(
+        self,
+        folders: dict[str, MonthFolder],
+    ) -> list[str]:
+        cutoff = self._cutoff_datetime()
+
+        return [
+            month
+            for month, folder in folders.items()
+            if folder.last_modified >= cutoff
+        ]
+
+    def _changed_months(
+        self,
+        folders: dict[str, MonthFolder],
+        read_only: bool = False,
+    ) -> list[str]:
+        """
+        Months new or changed since they were last processed.
+
+        Unchanged folders cost nothing beyond the root listing. When a
+        folder's ETag / last-modified moved, its files are listed and
+        compared, so changes to unrelated files are ignored.
+
+        On the first run (no state file yet) months older than the
+        time window are recorded as a baseline instead of returned.
+        """
+        bootstrap = not self.state_path.exists()
+        state = self._read_state()
+        cutoff = self._cutoff_datetime()
+
+        changed: list[str] = []
+
+        for month, folder in folders.items():
+            entry = state.get(month)
+
+            if entry is None:
+                if bootstrap and folder.last_modified < cutoff:
+                    state[month] = self._folder_state(folder)
+                    continue
+
+                self._files[month] = self._list_month_files(month)
+                changed.append(month)
+                continue
+
+            if not self._folder_changed(folder, entry):
+                continue
+
+            files = self._list_month_files(month)
+
+            if files == entry.get("files"):
+                # Folder metadata moved, relevant files did not
+                entry.update(self._folder_state(folder))
+                continue
+
+            self._files[month] = files
+            changed.append(month)
+
+        if not read_only:
+            self._save_state(state)
+
+        return changed
+
+    def _folder_changed(self, folder: MonthFolder, entry: dict) -> bool:
+        if folder.etag and entry.get("etag"):
+            return folder.etag != entry["etag"]
+
+        return folder.last_modified.isoformat() != entry.get(
+            "last_modified"
+        )
+
+    def _folder_state(self, folder: MonthFolder) -> dict:
+        return {
+            "etag": folder.etag,
+            "last_modified": folder.last_modified.isoformat(),
+        }
+
+    # ----------------------------------------------------
+    # STATE FILE
+    # ----------------------------------------------------
+
+    def _read_state(self) -> dict[str, dict]:
+        if not self.state_path.exists():
+            return {}
+
+        try:
+            with self.state_path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            print(f"[WATCHER] Ignoring unreadable {self.state_path}")
+            return {}
+
+        return data if isinstance(data, dict) else {}
+
+    def _save_state(self, state: dict[str, dict]) -> None:
+        """
+        Write the state file atomically.
+        """
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = self.state_path.with_name(f"{self.state_path.name}.tmp")
+
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+
+        os.replace(tmp_path, self.state_path)
+
     # ----------------------------------------------------
     # INTERNALS
     # ----------------------------------------------------
@@ -58,59 +278,193 @@ class CNPJMonthFinder:
         auth = base64.b64encode(f"{self.public_token}:".encode()).decode()
         return f"Basic {auth}"
 
-    def _list_month_folders(self) -> dict[str, datetime]:
+    def _propfind(
+        self,
+        url: str,
+        props: tuple[str, ...],
+        operation: str,
+        depth: str = "1",
+    ) -> list[DavEntry]:
         """
-        List monthly folders and their getlastmodified timestamps.
+        PROPFIND for the given props, with retries. The response is
+        parsed as it streams in; no DOM of the full body is built.
         """
-        url = f"{self.WEBDAV_BASE}/Dados/Cadastros/CNPJ/"
-
         headers = {
             "Authorization": self._auth_header(),
-            "Depth": "1",
+            "Depth": depth,
             "User-Agent": "cnpj-getter",
             "Content-Type": "application/xml",
         }
 
-        body = b"""<?xml version="1.0"?>
-            <d:propfind xmlns:d="DAV:">
-                <d:prop>
-                    <d:getlastmodified />
-                </d:prop>
-            </d:propfind>
+        retry = self.retry_policy.start(operation)
+
+        while True:
+            try:
+                req = urllib.request.Request(
+                    url,
+                    data=propfind_body(*props),
+                    headers=headers,
+                    method="PROPFIND",
+                )
+
+                with urllib.request.urlopen(req, timeout=120) as resp:
+                    return list(iter_propfind(resp))
+
+            except urllib.error.HTTPError as exc:
+                # Infinite depth refused by the server: no point retrying
+                if depth == "infinity" and exc.code in (400, 403, 501):
+                    raise
+
+                if not retry.backoff(exc):
+                    raise RuntimeError(f"Failed {operation}") from exc
+
+            except (*RETRYABLE_ERRORS, ET.ParseError) as exc:
+                if not retry.backoff(exc):
+                    raise RuntimeError(f"Failed {operation}") from exc
+
+    def _list_month_folders(self) -> dict[str, MonthFolder]:
         """
+        List monthly folders with their getlastmodified and getetag.
+        """
+        url = f"{self.WEBDAV_BASE}/Dados/Cadastros/CNPJ/"
 
-        req = urllib.request.Request(
+        entries = self._propfind(
             url,
-            data=body,
-            headers=headers,
-            method="PROPFIND",
+            ("getlastmodified", "getetag"),
+            "listing month folders",
         )
 
-        with urllib.request.urlopen(req, timeout=120) as resp:
-            xml_data = resp.read()
+        months: dict[str, MonthFolder] = {}
 
-        tree = ET.fromstring(xml_data)
+        for entry in entries:
+            # only YYYY-MM folders
+            if not self._is_month_folder(entry.name):
+                continue
 
-        months: dict[str, datetime] = {}
+            folder = self._month_folder(entry.name, entry)
 
-        for response in tree.findall("{DAV:}response"):
-            href = response.find("{DAV:}href")
-            prop = response.find(".//{DAV:}getlastmodified")
+            if folder is not None:
+                months[entry.name] = folder
 
-            if href is None or prop is None:
+        return months
+
+    def _list_tree(self) -> dict[str, MonthFolder]:
+        """
+        List month folders and their files in one Depth: infinity
+        PROPFIND. Files are kept for _list_month_files and the
+        downloader.
+
+        Servers with infinite depth disabled (SabreDAV / Nextcloud)
+        may silently answer as Depth: 1. A listing with folders but no
+        file at all is taken as such, and files are then listed per
+        month. Months without relevant files are listed again too,
+        rather than trusted as empty.
+        """
+        url = f"{self.WEBDAV_BASE}/Dados/Cadastros/CNPJ/"
+
+        try:
+            entries = self._propfind(
+                url,
+                FILE_PROPS,
+                "listing CNPJ tree",
+                depth="infinity",
+            )
+        except urllib.error.HTTPError as exc:
+            print(
+                f"[WATCHER] Depth infinity refused ({exc.code}), "
+                f"listing folders one by one"
+            )
+            return self._list_month_folders()
+
+        months: dict[str, MonthFolder] = {}
+        file_entries = 0
+
+        for entry in entries:
+            # ".../CNPJ/<month>/" or ".../CNPJ/<month>/<file>"
+            parts = (
+                entry.href.split("/Dados/Cadastros/CNPJ/", 1)[-1]
+                .strip("/")
+                .split("/")
+            )
+
+            if not self._is_month_folder(parts[0]):
                 continue
 
-            name = href.text.rstrip("/").split("/")[-1]
+            if len(parts) == 1:
+                folder = self._month_folder(parts[0], entry)
+
+                if folder is not None:
+                    months[parts[0]] = folder
 
-            # only YYYY-MM folders
-            if not self._is_month_folder(name):
                 continue
 
-            last_modified = self._parse_http_datetime(prop.text)
-            months[name] = last_modified
+            file_entries += 1
+
+            if len(parts) == 2 and dataset_for_zip(parts[1]) is not None:
+                files = self._tree_files.setdefault(parts[0], {})
+                files[parts[1]] = self._file_entry(entry)
+
+        if months and not file_entries:
+            print(
+                "[WATCHER] Depth infinity answered as depth 1, "
+                "listing files month by month"
+            )
+            return months
+
+        print(
+            f"[WATCHER] Listed {len(months)} months and "
+            f"{sum(len(f) for f in self._tree_files.values())} files "
+            f"in one request"
+        )
 
         return months
 
+    def _list_month_files(self, month: str) -> dict[str, dict]:
+        """
+        ETag, last-modified and size of the relevant ZIPs of a month.
+        """
+        if month in self._tree_files:
+            return self._tree_files[month]
+
+        url = f"{self.WEBDAV_BASE}/Dados/Cadastros/CNPJ/{month}/"
+
+        entries = self._propfind(
+            url,
+            FILE_PROPS,
+            f"listing files for {month}",
+        )
+
+        return {
+            entry.name: self._file_entry(entry)
+            for entry in entries
+            if dataset_for_zip(entry.name) is not None
+        }
+
+    def _month_folder(
+        self,
+        name: str,
+        entry: DavEntry,
+    ) -> MonthFolder | None:
+        last_modified = entry.props.get("getlastmodified")
+
+        if last_modified is None:
+            return None
+
+        return MonthFolder(
+            name=name,
+            last_modified=self._parse_http_datetime(last_modified),
+            etag=entry.props.get("getetag"),
+        )
+
+    def _file_entry(self, entry: DavEntry) -> dict:
+        length = entry.props.get("getcontentlength")
+
+        return {
+            "etag": entry.props.get("getetag"),
+            "last_modified": entry.props.get("getlastmodified"),
+            "size": int(length) if length else None,
+        }
+
     def _is_month_folder(self, name: str) -> bool:
         if len(name) != 7:
             return False
@@ -0,0 +1,210 @@
+from dataclasses import dataclass
+
+from app.pipeline.disk import GIB, DiskEstimate, DiskGuard
+from app.pipeline.download import CNPJDownloader
+from app.pipeline.extract import CNPJExtractor
+from app.pipeline.manifest import MonthManifest
+from app.pipeline.warehouse import CNPJWarehouse
+
+
+MIB = 1024 * 1024
+
+
+# ============================================================
+# RESULT
+# ============================================================
+
+@dataclass(frozen=True)
+class FilePlan:
+    """
+    What a run would do with one listed ZIP.
+
+    - state      : "present", "cached", "partial" or "missing"
+    - fetch_bytes: bytes still to download
+    - extract    : False if its extraction is unchanged
+    """
+    name: str
+    size: int | None
+    state: str
+    fetch_bytes: int
+    extract: bool
+
+
+@dataclass(frozen=True)
+class MonthPlan:
+    """
+    What a run would do with one month.
+    """
+    month: str
+    files: list[FilePlan]
+    load: bool
+    disk: DiskEstimate
+
+    @property
+    def fetch_bytes(self) -> int:
+        return sum(f.fetch_bytes for f in self.files)
+
+
+# ============================================================
+# PLANNER
+# ============================================================
+
+class CNPJPlanner:
+    """
+    Dry run of the pipeline: list what would be downloaded (or taken
+    from the cache), extracted and loaded per month, with the bytes
+    to fetch and a time estimate from the download run log.
+
+    Nothing is downloaded or written.
+    """
+
+    def __init__(
+        self,
+        downloader: CNPJDownloader,
+        extractor: CNPJExtractor,
+        warehouse: CNPJWarehouse,
+        disk: DiskGuard,
+    ) -> None:
+        self.downloader = downloader
+        self.extractor = extractor
+        self.warehouse = warehouse
+        self.disk = disk
+
+    # ----------------------------------------------------
+    # PUBLIC API
+    # ----------------------------------------------------
+
+    def plan_month(self, month: str) -> MonthPlan:
+        remote_zips = self.downloader.list_month(month)
+        raw_month_dir = self.downloader.raw_dir / month
+
+        files: list[FilePlan] = []
+
+        for remote in sorted(remote_zips, key=lambda r: r.name):
+            state, fetch_bytes = self.downloader.inspect_file(month, remote)
+
+            # Only a ZIP already on disk can have an unchanged extraction
+            extract = self.warehouse.source != "zip" and (
+                state != "present"
+                or not self.extractor.is_extracted(
+                    month, raw_month_dir / remote.name
+                )
+            )
+
+            files.append(
+                FilePlan(
+                    name=remote.name,
+                    size=remote.size,
+                    state=state,
+                    fetch_bytes=fetch_bytes,
+                    extract=extract,
+                )
+            )
+
+        loaded = (
+            self.warehouse.is_loaded(
+                month, MonthManifest(raw_month_dir).month_digest()
+            )
+            and self.downloader.is_month_current(month)
+        )
+
+        return MonthPlan(
+            month=month,
+            files=files,
+            load=not loaded,
+            disk=self.disk.estimate(
+                month, {r.name: r.size for r in remote_zips}
+            ),
+        )
+
+    def print_plan(
+        self,
+        months: list[str],
+        throughput: float | None = None,
+    ) -> list[MonthPlan]:
+        """
+        Plan and print each month, then the totals.
+        throughput is the historical per-file rate in bytes/s.
+        """
+        rate = self._aggregate_rate(throughput)
+        plans = [self.plan_month(month) for month in months]
+
+        for plan in plans:
+            self._print_month(plan, rate)
+
+        total = sum(plan.fetch_bytes for plan in plans)
+
+        print(
+            f"[PLAN] Total: {len(plans)} months, "
+            f"{total / GIB:.2f} GiB to download"
+            + self._eta(total, rate)
+        )
+
+        return plans
+
+    # ----------------------------------------------------
+    # INTERNALS
+    # ----------------------------------------------------
+
+    def _print_month(self, plan: MonthPlan, rate: float | None) -> None:
+        listed = sum(f.size or 0 for f in plan.files)
+
+        print(
+            f"[PLAN] {plan.month}: {len(plan.files)} ZIPs, "
+            f"{listed / GIB:.2f} GiB listed"
+        )
+
+        for f in plan.files:
+            print(
+                f"[PLAN]   {f.state:<8} "
+                f"{'extract' if f.extract else 'unchanged':<9} "
+                f"{(f.size or 0) / MIB:>10.1f} MiB  {f.name}"
+            )
+
+        to_fetch = [f for f in plan.files if f.fetch_bytes]
+        cached = sum(1 for f in plan.files if f.state == "cached")
+        to_extract = sum(1 for f in plan.files if f.extract)
+
+        print(
+            f"[PLAN]   Download: {len(to_fetch)} files, "
+            f"{plan.fetch_bytes / GIB:.2f} GiB"
+            + self._eta(plan.fetch_bytes, rate)
+            + (f", {cached} from cache" if cached else "")
+        )
+        print(f"[PLAN]   Extract: {to_extract}/{len(plan.files)} ZIPs")
+        print(
+            f"[PLAN]   Load: "
+            + ("yes" if plan.load else "no, already loaded")
+        )
+        print(
+            f"[PLAN]   Disk: ~{plan.disk.required / GIB:.1f} GiB needed, "
+            f"{min(plan.disk.free_bytes.values()) / GIB:.1f} GiB free"
+            + ("" if plan.disk.sufficient else " (NOT ENOUGH)")
+        )
+
+    def _aggregate_rate(self, throughput: float | None) -> float | None:
+        """
+        Expected month download rate: per-file history times the
+        worker count, capped by the bandwidth limit.
+        """
+        if throughput is None:
+            return None
+
+        rate = throughput * self.downloader.concurrency.limit
+        limit = self.downloader.bandwidth.current_rate()
+
+        if self.downloader.bandwidth.enabled and limit is not None:
+            rate = min(rate, limit)
+
+        return rate
+
+    def _eta(self, size: int, rate: float | None) -> str:
+        if not size:
+            return ""
+
+        if rate is None:
+            return " (no throughput history for an estimate)"
+
+        minutes = size / rate / 60
+
+        return f" (~{minutes:.0f} min at {rate / MIB:.1f} MiB/s)"
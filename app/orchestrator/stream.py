@@ -0,0 +1,148 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import threading
+
+from app.pipeline.disk import DiskGuard
+from app.pipeline.download import CNPJDownloader
+from app.pipeline.extract import CNPJExtractor
+from app.pipeline.manifest import MonthManifest
+from app.pipeline.warehouse import CNPJWarehouse
+
+
+class CNPJStreamingPipeline:
+    """
+    Run download, extraction and loading of a month concurrently.
+
+    Each ZIP is extracted as soon as the downloader reports it
+    complete, and each extracted CSV is loaded into DuckDB right after,
+    so network, decompression and ingestion overlap across files.
+    Loading runs on a single thread (DuckDB has one writer).
+
+    With a warehouse loading from ZIPs, each ZIP is loaded as soon as
+    it is downloaded, with no extraction step.
+
+    With a cleanup-enabled DiskGuard, a ZIP and its CSVs are removed
+    as soon as all of its CSVs are loaded.
+    """
+
+    def __init__(
+        self,
+        downloader: CNPJDownloader,
+        extractor: CNPJExtractor,
+        warehouse: CNPJWarehouse,
+        extract_workers: int = 2,
+        disk: DiskGuard | None = None,
+    ) -> None:
+        self.downloader = downloader
+        self.extractor = extractor
+        self.warehouse = warehouse
+        self.extract_workers = extract_workers
+        self.disk = disk
+
+    # ----------------------------------------------------
+    # PUBLIC API
+    # ----------------------------------------------------
+
+    def run_month(self, month: str) -> None:
+        """
+        Download, extract and load a month, then build leads.
+        Fails before build_leads if any file could not be processed.
+        """
+        print(f"[STREAM] Streaming pipeline for {month}")
+
+        self.warehouse.reset_raw()
+
+        failures: list[str] = []
+        lock = threading.Lock()
+
+        def load(path: Path) -> None:
+            try:
+                self.warehouse.load_file(path)
+            except Exception as exc:
+                print(f"[STREAM] Failed to load {path.name}: {exc}")
+                with lock:
+                    failures.append(path.name)
+
+        def release(zip_path: Path, paths: list[Path]) -> None:
+            if self.disk is None:
+                return
+
+            files = [*paths, zip_path]
+
+            with lock:
+                loaded = not any(path.name in failures for path in files)
+
+            if not loaded:
+                return
+
+            try:
+                self.disk.release(files)
+            except Exception as exc:
+                print(f"[STREAM] Failed to release {zip_path.name}: {exc}")
+                with lock:
+                    failures.append(zip_path.name)
+
+        # Inner pool drains first, so extraction can still queue loads
+        with ThreadPoolExecutor(max_workers=1) as load_pool:
+            with ThreadPoolExecutor(
+                max_workers=self.extract_workers
+            ) as extract_pool:
+
+                def extract(zip_path: Path) -> None:
+                    try:
+                        queue_loads(zip_path)
+                    except Exception as exc:
+                        print(
+                            f"[STREAM] Failed to extract {zip_path.name}: {exc}"
+                        )
+                        with lock:
+                            failures.append(zip_path.name)
+
+                def queue_loads(zip_path: Path) -> None:
+                    if self.warehouse.source == "zip":
+                        load_pool.submit(load, zip_path)
+                        load_pool.submit(release, zip_path, [])
+                        return
+
+                    result = self.extractor.extract_zip(month, zip_path)
+
+                    with lock:
+                        failures.extend(
+                            path.name for path in result.failed_files
+                        )
+
+                    paths = result.extracted_files
+
+                    # Unchanged ZIPs still feed the freshly reset RAW tables
+                    if zip_path in result.skipped_files:
+                        paths = self.extractor.extracted_members(
+                            month, zip_path
+                        )
+
+                    for path in paths:
+                        load_pool.submit(load, path)
+
+                    # Runs after the loads above (single load thread)
+                    load_pool.submit(release, zip_path, paths)
+
+                def on_file_ready(zip_path: Path) -> None:
+                    print(f"[STREAM] Ready: {zip_path.name}")
+                    extract_pool.submit(extract, zip_path)
+
+                self.downloader.download_month(
+                    month,
+                    on_file_ready=on_file_ready,
+                )
+
+        if failures:
+            raise RuntimeError(
+                f"[STREAM] {len(failures)} files failed for {month}: "
+                f"{', '.join(sorted(failures))}"
+            )
+
+        self.warehouse.build_leads(month)
+
+        manifest = MonthManifest(self.downloader.raw_dir / month)
+        self.warehouse.mark_loaded(month, manifest.month_digest())
+
+        print(f"[STREAM] Month {month} completed")
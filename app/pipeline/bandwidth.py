@@ -0,0 +1,154 @@
+from dataclasses import dataclass
+from datetime import datetime, time as dt_time
+import threading
+import time
+
+
+# ============================================================
+# SCHEDULE
+# ============================================================
+
+@dataclass(frozen=True)
+class RateWindow:
+    """
+    Bandwidth rate applied between two local times of day.
+    The window may wrap midnight (e.g. 22:00-06:00).
+    rate of None means unlimited.
+    """
+    start: dt_time
+    end: dt_time
+    rate: int | None
+
+    def contains(self, moment: dt_time) -> bool:
+        if self.start <= self.end:
+            return self.start <= moment < self.end
+
+        return moment >= self.start or moment < self.end
+
+
+def parse_rate(value: str) -> int | None:
+    """
+    Parse "512K", "20M", "1G" or a plain byte count into bytes/second.
+    Empty, "0" and "unlimited" mean no limit.
+    """
+    value = value.strip().upper()
+
+    if value in ("", "0", "UNLIMITED"):
+        return None
+
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    multiplier = units.get(value[-1], 1)
+
+    if value[-1] in units:
+        value = value[:-1]
+
+    return int(float(value) * multiplier)
+
+
+def parse_schedule(value: str) -> list[RateWindow]:
+    """
+    Parse "08:00-18:00=5M,18:00-08:00=0" into RateWindow entries.
+    """
+    windows: list[RateWindow] = []
+
+    for item in value.split(","):
+        item = item.strip()
+
+        if not item:
+            continue
+
+        span, _, rate = item.partition("=")
+        start, _, end = span.partition("-")
+
+        windows.append(
+            RateWindow(
+                start=dt_time.fromisoformat(start.strip()),
+                end=dt_time.fromisoformat(end.strip()),
+                rate=parse_rate(rate),
+            )
+        )
+
+    return windows
+
+
+# ============================================================
+# LIMITER
+# ============================================================
+
+class BandwidthLimiter:
+    """
+    Token bucket shared by every download worker and segment.
+
+    Tokens are bytes, refilled at the current rate with one second of
+    burst. Reads larger than the bucket are let through once it is
+    full and leave it in debt, so later reads wait for the refill.
+    The rate comes from the first matching schedule window, falling
+    back to the default rate.
+    """
+
+    def __init__(
+        self,
+        rate: int | None = None,
+        schedule: list[RateWindow] | None = None,
+    ) -> None:
+        self.rate = rate
+        self.schedule = schedule or []
+
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, rate: str, schedule: str) -> "BandwidthLimiter":
+        return cls(
+            rate=parse_rate(rate),
+            schedule=parse_schedule(schedule),
+        )
+
+    # --------------------------------------------------------
+    # PUBLIC API
+    # --------------------------------------------------------
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate is not None or bool(self.schedule)
+
+    def current_rate(self) -> int | None:
+        now = datetime.now().time()
+
+        for window in self.schedule:
+            if window.contains(now):
+                return window.rate
+
+        return self.rate
+
+    def consume(self, count: int) -> None:
+        """
+        Block until count bytes may be transferred.
+        """
+        while True:
+            with self._lock:
+                rate = self.current_rate()
+
+                if rate is None:
+                    return
+
+                now = time.monotonic()
+                capacity = float(rate)
+
+                self._tokens = min(
+                    capacity,
+                    self._tokens + (now - self._updated) * rate,
+                )
+                self._updated = now
+
+                needed = min(float(count), capacity)
+
+                if self._tokens >= needed:
+                    self._tokens -= count
+                    return
+
+                wait = (needed - self._tokens) / rate
+
+            # Sleep in short steps so schedule changes apply quickly
+            time.sleep(min(wait, 1.0))
@@ -0,0 +1,217 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+from app.pipeline.checksum import ALGORITHM
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows
+    fcntl = None
+
+
+# Linux ioctl to share extents between files (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+
+class ZipCache:
+    """
+    Content-addressed cache of Receita ZIP files.
+
+    Entries are keyed by month, file name, size and ETag, so a ZIP
+    republished under the same name is a different entry. The root can
+    be a local directory or a shared mount used by several hosts.
+
+    Files are placed with a hardlink when possible, then a reflink,
+    then a plain copy. Writes go through a temporary name and an
+    atomic rename, so readers never see partial entries.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    # --------------------------------------------------------
+    # PUBLIC API
+    # --------------------------------------------------------
+
+    def fetch(
+        self,
+        month: str,
+        name: str,
+        size: int | None,
+        etag: str | None,
+        out_path: Path,
+    ) -> str | None:
+        """
+        Place a cached ZIP at out_path.
+        Returns its recorded digest, or None on a cache miss.
+        """
+        entry_path = self._entry_path(month, name, size, etag)
+
+        if entry_path is None or not entry_path.exists():
+            return None
+
+        meta = self._read_meta(entry_path)
+
+        if meta is None or entry_path.stat().st_size != size:
+            return None
+
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._tmp_path(out_path)
+
+        try:
+            self._place(entry_path, tmp_path)
+            os.replace(tmp_path, out_path)
+        except OSError as exc:
+            tmp_path.unlink(missing_ok=True)
+            print(f"[CACHE] Failed to use cached {name}: {exc}")
+            return None
+
+        print(f"[CACHE] Hit: {month}/{name}")
+        return meta["digest"]
+
+    def contains(
+        self,
+        month: str,
+        name: str,
+        size: int | None,
+        etag: str | None,
+    ) -> bool:
+        """
+        True if fetch would find a complete entry.
+        """
+        entry_path = self._entry_path(month, name, size, etag)
+
+        return (
+            entry_path is not None
+            and entry_path.exists()
+            and entry_path.stat().st_size == size
+            and self._read_meta(entry_path) is not None
+        )
+
+    def store(
+        self,
+        month: str,
+        name: str,
+        size: int | None,
+        etag: str | None,
+        path: Path,
+        digest: str,
+    ) -> None:
+        """
+        Add a downloaded ZIP to the cache. Failures only log.
+        """
+        entry_path = self._entry_path(month, name, size, etag)
+
+        if entry_path is None or entry_path.exists():
+            return
+
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._tmp_path(entry_path)
+
+        try:
+            self._write_meta(
+                entry_path,
+                {
+                    "month": month,
+                    "name": name,
+                    "size": size,
+                    "etag": etag,
+                    "digest": digest,
+                    "digest_algorithm": ALGORITHM,
+                },
+            )
+            self._place(path, tmp_path)
+            os.replace(tmp_path, entry_path)
+        except OSError as exc:
+            tmp_path.unlink(missing_ok=True)
+            print(f"[CACHE] Failed to store {name}: {exc}")
+            return
+
+        print(f"[CACHE] Stored: {month}/{name}")
+
+    # --------------------------------------------------------
+    # INTERNALS
+    # --------------------------------------------------------
+
+    def _entry_path(
+        self,
+        month: str,
+        name: str,
+        size: int | None,
+        etag: str | None,
+    ) -> Path | None:
+        """
+        Cache location, or None when the file cannot be addressed
+        safely (no size or ETag listed).
+        """
+        if size is None or not etag:
+            return None
+
+        key = hashlib.sha256(
+            f"{month}\0{name}\0{size}\0{etag}".encode()
+        ).hexdigest()
+
+        return self.root / key[:2] / f"{key}.zip"
+
+    def _meta_path(self, entry_path: Path) -> Path:
+        return entry_path.with_suffix(".json")
+
+    def _read_meta(self, entry_path: Path) -> dict | None:
+        """
+        Sidecar of an entry, or None if it is unreadable or has no
+        digest (the entry then counts as missing).
+        """
+        try:
+            with self._meta_path(entry_path).open("r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(meta, dict) or not meta.get("digest"):
+            return None
+
+        return meta
+
+    def _write_meta(self, entry_path: Path, meta: dict) -> None:
+        meta_path = self._meta_path(entry_path)
+        tmp_path = self._tmp_path(meta_path)
+
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+        os.replace(tmp_path, meta_path)
+
+    def _tmp_path(self, path: Path) -> Path:
+        return path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+
+    def _place(self, src: Path, dst: Path) -> None:
+        """
+        Hardlink, else reflink, else copy src to dst.
+        """
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+
+        if self._reflink(src, dst):
+            return
+
+        shutil.copyfile(src, dst)
+
+    def _reflink(self, src: Path, dst: Path) -> bool:
+        if fcntl is None:
+            return False
+
+        try:
+            with src.open("rb") as s, dst.open("wb") as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            return True
+        except OSError:
+            dst.unlink(missing_ok=True)
+            return False
@@ -0,0 +1,124 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import hashlib
+import os
+
+
+# ============================================================
+# BLOCK DIGEST
+# ============================================================
+
+# Files are hashed as independent 64 MiB blocks. The file digest is
+# the SHA-256 of the concatenated block SHA-256 digests, so blocks can
+# be hashed out of order (parallel segments) or on several threads.
+BLOCK_SIZE = 64 * 1024 * 1024
+ALGORITHM = "sha256-tree-64m"
+
+
+def combine_blocks(blocks: dict[int, bytes]) -> str:
+    """
+    File digest from block digests keyed by block index.
+    """
+    if sorted(blocks) != list(range(len(blocks))):
+        raise ValueError("Missing block digests")
+
+    root = hashlib.sha256()
+
+    for index in range(len(blocks)):
+        root.update(blocks[index])
+
+    return root.hexdigest()
+
+
+class BlockHasher:
+    """
+    Incremental block hasher for a contiguous byte stream starting at
+    any offset of the file. Bytes before the first block boundary are
+    skipped: only blocks seen from their first byte are hashed, the
+    others are left to digest_file.
+    """
+
+    def __init__(self, start: int = 0, block_size: int = BLOCK_SIZE) -> None:
+        self.block_size = block_size
+        self.position = start
+        self.blocks: dict[int, bytes] = {}
+
+        self._skip = -start % block_size
+        self._current = hashlib.sha256()
+
+    def update(self, data: bytes) -> None:
+        view = memoryview(data)
+
+        if self._skip:
+            skipped = min(self._skip, len(view))
+            self._skip -= skipped
+            self.position += skipped
+            view = view[skipped:]
+
+        while view:
+            room = self.block_size - self.position % self.block_size
+            part = view[:room]
+
+            self._current.update(part)
+            self.position += len(part)
+            view = view[len(part):]
+
+            if self.position % self.block_size == 0:
+                index = self.position // self.block_size - 1
+                self.blocks[index] = self._current.digest()
+                self._current = hashlib.sha256()
+
+    def finish(self, at_end: bool = True) -> dict[int, bytes]:
+        """
+        Return the block digests. at_end tells that the stream reached
+        the end of the file, which closes the trailing partial block.
+        """
+        if at_end and not self._skip and (
+            self.position % self.block_size or self.position == 0
+        ):
+            index = self.position // self.block_size
+            self.blocks[index] = self._current.digest()
+            self._current = hashlib.sha256()
+
+        return self.blocks
+
+
+def digest_file(
+    path: Path,
+    blocks: dict[int, bytes] | None = None,
+    workers: int | None = None,
+) -> str:
+    """
+    Block digest of a file on disk, hashing blocks on a thread pool.
+    hashlib releases the GIL, so blocks are hashed in parallel.
+    Blocks already hashed while streaming are passed in blocks and
+    not read again.
+    """
+    size = path.stat().st_size
+    count = max(1, -(-size // BLOCK_SIZE))
+    blocks = dict(blocks or {})
+    missing = [index for index in range(count) if index not in blocks]
+
+    def hash_block(index: int) -> tuple[int, bytes]:
+        hasher = hashlib.sha256()
+        remaining = min(BLOCK_SIZE, size - index * BLOCK_SIZE)
+
+        with path.open("rb") as f:
+            f.seek(index * BLOCK_SIZE)
+
+            while remaining > 0:
+                chunk = f.read(min(1024 * 1024, remaining))
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                remaining -= len(chunk)
+
+        return index, hasher.digest()
+
+    if missing:
+        workers = workers or min(len(missing), os.cpu_count() or 1)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            blocks.update(executor.map(hash_block, missing))
+
+    return combine_blocks(blocks)
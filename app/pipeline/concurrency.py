@@ -0,0 +1,268 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+import threading
+import time
+
+
+# ============================================================
+# RESULT
+# ============================================================
+
+@dataclass(frozen=True)
+class ConcurrencyStats:
+    """
+    Concurrency levels and throughput observed during one round.
+    """
+    limit: int
+    low: int
+    high: int
+    bytes_per_second: float
+    errors: int
+    latency_spikes: int
+
+
+class ConcurrencyRound:
+    """
+    Counters of one download round. Rounds of different months may
+    run at once on the same controller; each only counts the traffic
+    recorded against it, while the limit range reflects the shared
+    limit during the round.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.started = time.monotonic()
+        self.bytes = 0
+        self.errors = 0
+        self.spikes = 0
+        self.low = limit
+        self.high = limit
+
+
+# ============================================================
+# CONTROLLER
+# ============================================================
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on the number of concurrent file downloads.
+
+    - Additive increase: at the end of each window, if aggregate
+      throughput improved and all slots were busy, limit += 1.
+    - Multiplicative decrease: on an error or a time-to-first-byte
+      spike, limit is halved (at most once per window). A spike is
+      latency_factor times the baseline and at least latency_floor
+      seconds above it; spikes still feed the baseline, so a lasting
+      rise in server latency becomes the new normal.
+
+    With adaptive=False the limit stays fixed at initial, so the
+    downloader can use the same slot() gate either way.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = 1,
+        maximum: int = 8,
+        adaptive: bool = True,
+        window: float = 30.0,
+        increase_threshold: float = 1.05,
+        latency_factor: float = 3.0,
+        latency_floor: float = 0.5,
+    ) -> None:
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.adaptive = adaptive
+        self.window = window
+        self.increase_threshold = increase_threshold
+        self.latency_factor = latency_factor
+        self.latency_floor = latency_floor
+
+        self._limit = min(max(initial, self.minimum), self.maximum)
+        self._active = 0
+        self._cond = threading.Condition()
+
+        # current window
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self._window_saturated = False
+        self._window_decreased = False
+        self._last_throughput: float | None = None
+
+        # time-to-first-byte baseline (EWMA)
+        self._latency_baseline: float | None = None
+
+        # rounds in progress, to track the limit range of each
+        self._rounds: list[ConcurrencyRound] = []
+
+    # --------------------------------------------------------
+    # PUBLIC API
+    # --------------------------------------------------------
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def capacity(self) -> int:
+        """
+        Highest limit the controller may reach (pool size).
+        """
+        return self.maximum if self.adaptive else self._limit
+
+    @contextmanager
+    def slot(self):
+        """
+        Block until a download slot is free under the current limit.
+        """
+        with self._cond:
+            while self._active >= self._limit:
+                self._cond.wait()
+
+            self._active += 1
+
+            if self._active >= self._limit:
+                self._window_saturated = True
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def record_bytes(
+        self,
+        count: int,
+        round: ConcurrencyRound | None = None,
+    ) -> None:
+        with self._cond:
+            self._window_bytes += count
+
+            if round is not None:
+                round.bytes += count
+
+            self._maybe_increase()
+
+    def record_latency(
+        self,
+        seconds: float,
+        round: ConcurrencyRound | None = None,
+    ) -> None:
+        """
+        Record time to first byte of a response.
+        """
+        with self._cond:
+            baseline = self._latency_baseline
+
+            self._latency_baseline = (
+                seconds
+                if baseline is None
+                else 0.8 * baseline + 0.2 * seconds
+            )
+
+            if (
+                baseline is not None
+                and seconds > baseline * self.latency_factor
+                and seconds - baseline >= self.latency_floor
+            ):
+                if round is not None:
+                    round.spikes += 1
+
+                self._decrease(
+                    f"latency spike {seconds:.1f}s "
+                    f"(baseline {baseline:.1f}s)"
+                )
+
+    def record_error(self, round: ConcurrencyRound | None = None) -> None:
+        with self._cond:
+            if round is not None:
+                round.errors += 1
+
+            self._decrease("download error")
+
+    def start_round(self) -> ConcurrencyRound:
+        """
+        Begin a round; pass it to the record_* calls of its transfers.
+        """
+        with self._cond:
+            round = ConcurrencyRound(self._limit)
+            self._rounds.append(round)
+            return round
+
+    def round_stats(self, round: ConcurrencyRound) -> ConcurrencyStats:
+        """
+        End a round and return its statistics.
+        """
+        with self._cond:
+            if round in self._rounds:
+                self._rounds.remove(round)
+
+            elapsed = max(time.monotonic() - round.started, 1e-9)
+
+            return ConcurrencyStats(
+                limit=self._limit,
+                low=round.low,
+                high=round.high,
+                bytes_per_second=round.bytes / elapsed,
+                errors=round.errors,
+                latency_spikes=round.spikes,
+            )
+
+    # --------------------------------------------------------
+    # INTERNALS
+    # --------------------------------------------------------
+
+    def _maybe_increase(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._window_start
+
+        if elapsed < self.window:
+            return
+
+        throughput = self._window_bytes / elapsed
+        previous = self._last_throughput
+
+        if (
+            self.adaptive
+            and not self._window_decreased
+            and self._window_saturated
+            and self._limit < self.maximum
+            and (
+                previous is None
+                or throughput > previous * self.increase_threshold
+            )
+        ):
+            self._set_limit(self._limit + 1, "throughput improved")
+
+        self._last_throughput = throughput
+        self._window_start = now
+        self._window_bytes = 0
+        self._window_saturated = self._active >= self._limit
+        self._window_decreased = False
+
+    def _decrease(self, reason: str) -> None:
+        if not self.adaptive or self._window_decreased:
+            return
+
+        self._window_decreased = True
+
+        # Throughput measured at the higher level is no longer a baseline
+        self._last_throughput = None
+
+        self._set_limit(max(self.minimum, self._limit // 2), reason)
+
+    def _set_limit(self, value: int, reason: str) -> None:
+        if value == self._limit:
+            return
+
+        print(
+            f"[CONCURRENCY] {self._limit} -> {value} workers ({reason})"
+        )
+
+        self._limit = value
+
+        for round in self._rounds:
+            round.low = min(round.low, value)
+            round.high = max(round.high, value)
+
+        self._cond.notify_all()
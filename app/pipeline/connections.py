@@ -0,0 +1,156 @@
+from contextlib import contextmanager
+import http.client
+import queue
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+# ============================================================
+# CONNECTION POOL
+# ============================================================
+
+class HTTPConnectionPool:
+    """
+    Keep-alive HTTP(S) connections shared by all download workers.
+
+    At most max_connections requests are in flight at once, across
+    files, segments and listings. Connections whose response was read
+    to the end are returned to the pool and reused.
+    """
+
+    def __init__(
+        self,
+        max_connections: int,
+        timeout: float = 120.0,
+    ) -> None:
+        self.max_connections = max_connections
+        self.timeout = timeout
+
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._idle: dict[tuple[str, str], queue.LifoQueue] = {}
+        self._idle_lock = threading.Lock()
+
+    # --------------------------------------------------------
+    # PUBLIC API
+    # --------------------------------------------------------
+
+    @contextmanager
+    def request(self, req: urllib.request.Request):
+        """
+        Send a urllib Request over a pooled connection.
+        Raises urllib.error.HTTPError for 4xx/5xx and URLError for
+        connection failures, like urlopen does.
+        """
+        url = urllib.parse.urlsplit(req.full_url)
+        key = (url.scheme, url.netloc)
+        path = url.path + (f"?{url.query}" if url.query else "")
+
+        with self._slots:
+            conn, resp = self._send(key, path, req)
+            reusable = False
+
+            try:
+                if resp.status >= 400:
+                    raise urllib.error.HTTPError(
+                        req.full_url,
+                        resp.status,
+                        resp.reason,
+                        resp.headers,
+                        resp,
+                    )
+
+                yield resp
+
+                reusable = resp.isclosed() and not resp.will_close
+
+            finally:
+                if reusable:
+                    self._release(key, conn)
+                else:
+                    conn.close()
+
+    def close(self) -> None:
+        with self._idle_lock:
+            for idle in self._idle.values():
+                while not idle.empty():
+                    idle.get_nowait().close()
+
+            self._idle.clear()
+
+    # --------------------------------------------------------
+    # INTERNALS
+    # --------------------------------------------------------
+
+    def _send(
+        self,
+        key: tuple[str, str],
+        path: str,
+        req: urllib.request.Request,
+    ) -> tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """
+        Send on an idle connection, falling back to a fresh one when
+        the server already closed the idle socket.
+        """
+        conn = self._acquire_idle(key)
+
+        if conn is not None:
+            try:
+                return conn, self._exchange(conn, path, req)
+            except (http.client.RemoteDisconnected, ConnectionError):
+                conn.close()
+
+        conn = self._connect(key)
+
+        try:
+            return conn, self._exchange(conn, path, req)
+        except OSError as exc:
+            # Refused, DNS, TLS...: same error type as urlopen
+            conn.close()
+            raise urllib.error.URLError(exc) from exc
+        except BaseException:
+            conn.close()
+            raise
+
+    def _exchange(
+        self,
+        conn: http.client.HTTPConnection,
+        path: str,
+        req: urllib.request.Request,
+    ) -> http.client.HTTPResponse:
+        conn.request(
+            req.get_method(),
+            path,
+            body=req.data,
+            headers=dict(req.header_items()),
+        )
+        return conn.getresponse()
+
+    def _acquire_idle(
+        self,
+        key: tuple[str, str],
+    ) -> http.client.HTTPConnection | None:
+        with self._idle_lock:
+            idle = self._idle.setdefault(key, queue.LifoQueue())
+
+        try:
+            return idle.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _connect(self, key: tuple[str, str]) -> http.client.HTTPConnection:
+        scheme, netloc = key
+
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def _release(
+        self,
+        key: tuple[str, str],
+        conn: http.client.HTTPConnection,
+    ) -> None:
+        with self._idle_lock:
+            self._idle.setdefault(key, queue.LifoQueue()).put(conn)
@@ -0,0 +1,171 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+
+# ============================================================
+# DATASET
+# ============================================================
+
+@dataclass(frozen=True)
+class Dataset:
+    """
+    One Receita CNPJ file family and where it lands in DuckDB.
+
+    - zip_prefix : ZIP name prefix on WebDAV (lowercase)
+    - csv_suffix : suffix of the CSV members inside the ZIP
+    - columns    : every CSV column, in file order (all VARCHAR)
+    - table      : target DuckDB table
+    - keep       : columns stored in the table
+    - kind       : "raw" (staging, rebuilt every load) or
+                   "dim" (incremental, deduplicated on key)
+    - key        : primary key of a dim table
+    """
+    name: str
+    zip_prefix: str
+    csv_suffix: str
+    columns: tuple[str, ...]
+    table: str
+    keep: tuple[str, ...]
+    kind: str = "raw"
+    key: str | None = None
+
+
+# ============================================================
+# REGISTRY
+# ============================================================
+
+# Only datasets listed here are downloaded, extracted and loaded.
+DATASETS: tuple[Dataset, ...] = (
+    Dataset(
+        name="estabelecimentos",
+        zip_prefix="estabelecimentos",
+        csv_suffix="ESTABELE",
+        columns=(
+            "cnpj_basico",
+            "cnpj_ordem",
+            "cnpj_dv",
+            "identificador_matriz_filial",
+            "nome_fantasia",
+            "situacao_cadastral",
+            "data_situacao_cadastral",
+            "motivo_situacao_cadastral",
+            "nome_cidade_exterior",
+            "pais",
+            "data_inicio_atividade",
+            "cnae_fiscal_principal",
+            "cnae_fiscal_secundaria",
+            "tipo_logradouro",
+            "logradouro",
+            "numero",
+            "complemento",
+            "bairro",
+            "cep",
+            "uf",
+            "municipio",
+            "ddd1",
+            "telefone1",
+            "ddd2",
+            "telefone2",
+            "ddd_fax",
+            "fax",
+            "correio_eletronico",
+            "situacao_especial",
+            "data_situacao_especial",
+        ),
+        table="estabelecimentos_raw",
+        keep=(
+            "cnpj_basico",
+            "cnpj_ordem",
+            "cnpj_dv",
+            "nome_fantasia",
+            "situacao_cadastral",
+            "cnae_fiscal_principal",
+            "cnae_fiscal_secundaria",
+            "municipio",
+            "uf",
+            "correio_eletronico",
+            "ddd1",
+            "telefone1",
+        ),
+    ),
+    Dataset(
+        name="empresas",
+        zip_prefix="empresas",
+        csv_suffix="EMPRECSV",
+        columns=(
+            "cnpj_basico",
+            "razao_social",
+            "natureza_juridica",
+            "qualificacao_responsavel",
+            "capital_social",
+            "porte_empresa",
+            "ente_federativo_responsavel",
+        ),
+        table="empresas_raw",
+        keep=(
+            "cnpj_basico",
+            "razao_social",
+            "porte_empresa",
+            "natureza_juridica",
+        ),
+    ),
+    Dataset(
+        name="cnae",
+        zip_prefix="cnae",
+        csv_suffix="CNAECSV",
+        columns=("codigo", "descricao"),
+        table="dim_cnae",
+        keep=("codigo", "descricao"),
+        kind="dim",
+        key="codigo",
+    ),
+    Dataset(
+        name="municipios",
+        zip_prefix="municipios",
+        csv_suffix="MUNICCSV",
+        columns=("codigo", "nome"),
+        table="dim_municipio",
+        keep=("codigo", "nome"),
+        kind="dim",
+        key="codigo",
+    ),
+)
+
+
+# ============================================================
+# LOOKUPS
+# ============================================================
+
+def dataset_for_zip(name: str) -> Dataset | None:
+    """
+    Dataset a WebDAV ZIP belongs to, by name prefix.
+    """
+    lowered = name.lower()
+
+    if not lowered.endswith(".zip"):
+        return None
+
+    for dataset in DATASETS:
+        if lowered.startswith(dataset.zip_prefix):
+            return dataset
+
+    return None
+
+
+def dataset_for_file(path: Path | str) -> Dataset | None:
+    """
+    Dataset an extracted CSV (or its Parquet copy) belongs to,
+    by file suffix.
+    """
+    path = Path(path)
+
+    if path.suffix.lower() == ".parquet":
+        path = path.with_suffix("")
+
+    suffix = path.suffix.lstrip(".").upper()
+
+    for dataset in DATASETS:
+        if suffix == dataset.csv_suffix:
+            return dataset
+
+    return None
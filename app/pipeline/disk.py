@@ -0,0 +1,354 @@
+from dataclasses import dataclass, replace
+from pathlib import Path
+import os
+import shutil
+import threading
+
+
+GIB = 1024 ** 3
+
+
+# ============================================================
+# ESTIMATE
+# ============================================================
+
+@dataclass(frozen=True)
+class DiskEstimate:
+    """
+    Disk a month still needs, per stage, against free space.
+
+    - zip_bytes : ZIP bytes not yet on disk
+    - csv_bytes : extracted CSV bytes not yet on disk
+    - db_bytes  : expected DuckDB growth
+    - free_bytes: free space per filesystem (device id -> bytes)
+    - need_bytes: required space per filesystem (device id -> bytes)
+    """
+    zip_bytes: int
+    csv_bytes: int
+    db_bytes: int
+    free_bytes: dict[int, int]
+    need_bytes: dict[int, int]
+
+    @property
+    def required(self) -> int:
+        return self.zip_bytes + self.csv_bytes + self.db_bytes
+
+    @property
+    def sufficient(self) -> bool:
+        return all(
+            need <= self.free_bytes[device]
+            for device, need in self.need_bytes.items()
+        )
+
+
+# ============================================================
+# GUARD
+# ============================================================
+
+class DiskGuard:
+    """
+    Disk space preflight and cleanup for one pipeline run.
+
+    The preflight sums the listed ZIP sizes and derives the CSV and
+    DuckDB footprint from them with fixed expansion ratios, then
+    checks each filesystem involved (data dir, DuckDB file) for room.
+
+    Months processed concurrently (backfill) reserve their estimate
+    at preflight. What reserved months still need is deducted from
+    the free space the next month is checked against, until they are
+    unreserved.
+
+    Cleanup is opt-in: ZIPs and CSVs are removed once their rows are
+    committed to DuckDB. Manifests are kept, so an unchanged month is
+    still recognised as loaded without its files.
+    """
+
+    def __init__(
+        self,
+        raw_dir: Path,
+        extracted_dir: Path,
+        duckdb_path: Path,
+        expansion_ratio: float = 4.0,
+        db_ratio: float = 1.0,
+        cleanup: bool = False,
+    ) -> None:
+        self.raw_dir = raw_dir
+        self.extracted_dir = extracted_dir
+        self.duckdb_path = duckdb_path
+
+        # CSV bytes per ZIP byte, DuckDB growth per ZIP byte
+        self.expansion_ratio = expansion_ratio
+        self.db_ratio = db_ratio
+
+        self.cleanup = cleanup
+
+        # month -> listed ZIP sizes, for months holding a reservation
+        self._reserved: dict[str, dict[str, int | None]] = {}
+        self._lock = threading.Lock()
+
+    # --------------------------------------------------------
+    # PREFLIGHT
+    # --------------------------------------------------------
+
+    def estimate(
+        self,
+        month: str,
+        sizes: dict[str, int | None],
+    ) -> DiskEstimate:
+        """
+        Estimate what a month still needs, given listed ZIP sizes
+        keyed by file name. Bytes already on disk are subtracted.
+        """
+        raw_month_dir = self.raw_dir / month
+        extracted_month_dir = self.extracted_dir / month
+
+        total = sum(size or 0 for size in sizes.values())
+        zip_bytes = 0
+
+        for name, size in sizes.items():
+            if not size:
+                continue
+
+            zip_bytes += max(
+                0,
+                size
+                - self._size_of(raw_month_dir / name)
+                - self._size_of(raw_month_dir / f"{name}.part"),
+            )
+
+        csv_bytes = max(
+            0,
+            int(total * self.expansion_ratio)
+            - self._dir_size(extracted_month_dir),
+        )
+        db_bytes = int(total * self.db_ratio)
+
+        data_device = self._device(self.raw_dir)
+        db_device = self._device(self.duckdb_path.parent)
+
+        need_bytes = {data_device: zip_bytes + csv_bytes}
+        need_bytes[db_device] = need_bytes.get(db_device, 0) + db_bytes
+
+        free_bytes = {
+            data_device: self._free(self.raw_dir),
+            db_device: self._free(self.duckdb_path.parent),
+        }
+
+        return DiskEstimate(
+            zip_bytes=zip_bytes,
+            csv_bytes=csv_bytes,
+            db_bytes=db_bytes,
+            free_bytes=free_bytes,
+            need_bytes=need_bytes,
+        )
+
+    def preflight(
+        self,
+        month: str,
+        sizes: dict[str, int | None],
+        reserve: bool = False,
+    ) -> DiskEstimate:
+        """
+        Fail before any work starts if a month cannot fit on disk,
+        next to what reserved months still need. With reserve, the
+        month holds its share until unreserve(month).
+        """
+        with self._lock:
+            estimate = self.estimate(month, sizes)
+            held = self._held(exclude=month)
+
+            if any(held.values()):
+                estimate = replace(
+                    estimate,
+                    free_bytes={
+                        device: free - held.get(device, 0)
+                        for device, free in estimate.free_bytes.items()
+                    },
+                )
+
+            print(
+                f"[DISK] {month} needs ~{estimate.required / GIB:.1f} GiB "
+                f"(ZIP {estimate.zip_bytes / GIB:.1f}, "
+                f"CSV {estimate.csv_bytes / GIB:.1f}, "
+                f"DuckDB {estimate.db_bytes / GIB:.1f}), "
+                f"free {min(estimate.free_bytes.values()) / GIB:.1f} GiB"
+                + (
+                    f" after {sum(held.values()) / GIB:.1f} GiB reserved"
+                    if any(held.values())
+                    else ""
+                )
+            )
+
+            if not estimate.sufficient:
+                raise RuntimeError(
+                    f"[DISK] Not enough free space for {month}: "
+                    f"needs ~{estimate.required / GIB:.1f} GiB, "
+                    f"free {min(estimate.free_bytes.values()) / GIB:.1f} GiB"
+                )
+
+            if reserve:
+                self._reserved[month] = dict(sizes)
+
+        return estimate
+
+    def unreserve(self, month: str) -> None:
+        """
+        Drop a month's reservation once it is loaded (or abandoned).
+        """
+        with self._lock:
+            self._reserved.pop(month, None)
+
+    # --------------------------------------------------------
+    # CLEANUP
+    # --------------------------------------------------------
+
+    def release(self, paths: list[Path]) -> int:
+        """
+        Delete files whose data is already in DuckDB, if cleanup is
+        enabled. Returns the bytes freed.
+        """
+        if not self.cleanup:
+            return 0
+
+        freed = 0
+
+        for path in paths:
+            size = self._size_of(path)
+
+            try:
+                path.unlink(missing_ok=True)
+            except OSError as exc:
+                print(f"[DISK] Failed to remove {path.name}: {exc}")
+                continue
+
+            freed += size
+
+        if freed:
+            print(
+                f"[DISK] Released {len(paths)} files, "
+                f"{freed / GIB:.2f} GiB"
+            )
+
+        return freed
+
+    def release_month(self, month: str) -> int:
+        """
+        Delete a loaded month's ZIPs and CSVs, keeping manifests.
+        """
+        paths = [
+            path
+            for month_dir in (
+                self.raw_dir / month,
+                self.extracted_dir / month,
+            )
+            if month_dir.exists()
+            for path in month_dir.iterdir()
+            if path.is_file() and path.name != "manifest.json"
+        ]
+
+        return self.release(paths)
+
+    # --------------------------------------------------------
+    # INTERNALS
+    # --------------------------------------------------------
+
+    def _held(self, exclude: str) -> dict[int, int]:
+        """
+        Bytes reserved months still need, per filesystem. Their
+        progress on disk is counted, so nothing is deducted twice.
+        """
+        held: dict[int, int] = {}
+
+        for month, sizes in self._reserved.items():
+            if month == exclude:
+                continue
+
+            for device, need in self.estimate(month, sizes).need_bytes.items():
+                held[device] = held.get(device, 0) + need
+
+        return held
+
+    def _size_of(self, path: Path) -> int:
+        try:
+            return path.stat().st_size
+        except OSError:
+            return 0
+
+    def _dir_size(self, path: Path) -> int:
+        if not path.exists():
+            return 0
+
+        return sum(self._size_of(child) for child in path.iterdir())
+
+    def _device(self, path: Path) -> int:
+        return os.stat(_existing(path)).st_dev
+
+    def _free(self, path: Path) -> int:
+        return shutil.disk_usage(_existing(path)).free
+
+
+# ============================================================
+# PEAK USAGE
+# ============================================================
+
+class DiskUsageMonitor:
+    """
+    Sample used space of the data filesystem in the background and
+    report the peak over a run.
+
+    Usage:
+        with DiskUsageMonitor(data_dir):
+            ...
+    """
+
+    def __init__(self, path: Path, interval: float = 5.0) -> None:
+        self.path = path
+        self.interval = interval
+
+        self.start_used = 0
+        self.peak_used = 0
+
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> "DiskUsageMonitor":
+        self.start_used = self.peak_used = self._used()
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join()
+
+        self._sample()
+
+        print(
+            f"[DISK] Peak usage {self.peak_used / GIB:.1f} GiB "
+            f"(+{(self.peak_used - self.start_used) / GIB:.2f} GiB "
+            f"over start)"
+        )
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        self.peak_used = max(self.peak_used, self._used())
+
+    def _used(self) -> int:
+        return shutil.disk_usage(_existing(self.path)).used
+
+
+def _existing(path: Path) -> Path:
+    """
+    Nearest existing ancestor, for paths not created yet.
+    """
+    while not path.exists() and path != path.parent:
+        path = path.parent
+
+    return path
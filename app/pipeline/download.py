@@ -1,19 +1,50 @@
 from dataclasses import dataclass
 from pathlib import Path
 import time
+import http.client
 import urllib.request
 import urllib.error
 import base64
-import xml.etree.ElementTree as ET
+import json
+import os
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable
 
 from tqdm import tqdm
 
+from app.pipeline.bandwidth import BandwidthLimiter
+from app.pipeline.cache import ZipCache
+from app.pipeline.checksum import (
+    ALGORITHM,
+    BlockHasher,
+    combine_blocks,
+    digest_file,
+)
+from app.pipeline.concurrency import AdaptiveConcurrency, ConcurrencyRound
+from app.pipeline.connections import HTTPConnectionPool
+from app.pipeline.datasets import dataset_for_zip
+from app.pipeline.manifest import MonthManifest
+from app.pipeline.retry import RETRYABLE_ERRORS, RetryPolicy
+from app.pipeline.telemetry import DownloadTelemetry, TransferProbe
+from app.pipeline.webdav import iter_propfind, propfind_body
+
 
 # ============================================================
 # RESULT
 # ============================================================
 
+@dataclass(frozen=True)
+class RemoteZip:
+    """
+    ZIP entry listed by WebDAV PROPFIND.
+    """
+    name: str
+    size: int | None
+    etag: str | None = None
+    last_modified: str | None = None
+
+
 @dataclass(frozen=True)
 class DownloadResult:
     """
@@ -45,37 +76,137 @@ class CNPJDownloader:
         public_token: str,
         raw_dir: Path,
         max_workers: int = 2,
+        adaptive_concurrency: bool = False,
+        max_adaptive_workers: int = 8,
+        listing_ttl: float = 600.0,
+        segments_per_file: int = 4,
+        min_segment_size: int = 64 * 1024 * 1024,
+        bandwidth: BandwidthLimiter | None = None,
+        retry_policy: RetryPolicy | None = None,
+        cache: ZipCache | None = None,
+        priority: str = "largest",
+        telemetry: DownloadTelemetry | None = None,
+        max_connections: int | None = None,
     ) -> None:
         self.public_token = public_token
         self.raw_dir = raw_dir
         self.max_workers = max_workers
+        self.listing_ttl = listing_ttl
+
+        # Fixed at max_workers unless adaptive (AIMD) is enabled
+        self.concurrency = AdaptiveConcurrency(
+            initial=max_workers,
+            maximum=max_adaptive_workers,
+            adaptive=adaptive_concurrency,
+        )
+        self.segments_per_file = segments_per_file
+        self.min_segment_size = min_segment_size
+
+        # Keep-alive connections shared by listings, files and segments,
+        # instead of a fresh TLS handshake per request
+        if max_connections is None:
+            max_connections = (
+                self.concurrency.capacity * max(1, segments_per_file)
+            )
+
+        self.pool = HTTPConnectionPool(max_connections=max_connections)
+
+        # Shared by all workers and segments; unlimited by default
+        self.bandwidth = bandwidth or BandwidthLimiter()
+
+        # Shared by listings, files, segments and download rounds
+        self.retry_policy = retry_policy or RetryPolicy()
+
+        # Optional shared ZIP cache checked before WebDAV
+        self.cache = cache
+
+        # Start order of downloads: "largest" or "dimensions"
+        if priority not in ("largest", "dimensions"):
+            raise ValueError(f"Unknown download priority: {priority}")
+
+        self.priority = priority
+
+        # Per-file transfer records (in memory unless a log is set)
+        self.telemetry = telemetry or DownloadTelemetry()
+
+        # None until the server is probed for Range support
+        self._ranges_supported: bool | None = None
+        self._ranges_lock = threading.Lock()
+
+        # month -> (monotonic fetch time, listing)
+        self._listing_cache: dict[str, tuple[float, list[RemoteZip]]] = {}
+
+        # month -> round in progress (months may download concurrently)
+        self._rounds: dict[str, ConcurrencyRound] = {}
 
     # --------------------------------------------------------
     # PUBLIC API
     # --------------------------------------------------------
 
-    def download_month(self, month: str) -> DownloadResult:
+    def download_month(
+        self,
+        month: str,
+        on_file_ready: Callable[[Path], None] | None = None,
+    ) -> DownloadResult:
         """
         Ensure that ALL ZIP files for a given month are downloaded.
         Will retry the month multiple times until complete or fail hard.
+
+        on_file_ready, if given, is called once per ZIP as soon as it
+        is complete on disk (already present or just downloaded and
+        size-validated), so later stages can start before the month
+        finishes downloading.
         """
         print(f"[DOWNLOADER] Ensuring complete download for {month}")
 
+        if self.bandwidth.enabled:
+            rate = self.bandwidth.current_rate()
+            print(
+                "[DOWNLOADER] Bandwidth limit: "
+                + (
+                    f"{rate / 1024 / 1024:.1f} MiB/s"
+                    if rate is not None
+                    else "unlimited (schedule)"
+                )
+            )
+
         max_rounds = 5
+        rounds = self.retry_policy.start(
+            f"download rounds for {month}",
+            max_attempts=max_rounds,
+            base_delay=10.0,
+        )
         downloaded_all: list[Path] = []
         skipped_all: list[Path] = []
+        ready: set[Path] = set()
+
+        def notify(path: Path) -> None:
+            if on_file_ready is not None and path not in ready:
+                ready.add(path)
+                on_file_ready(path)
 
         for round_num in range(1, max_rounds + 1):
             print(f"[DOWNLOADER] Download round {round_num}/{max_rounds}")
 
-            result = self._download_once(month)
+            self._rounds[month] = self.concurrency.start_round()
+            print(
+                f"[DOWNLOADER] Concurrency at round start: "
+                f"{self.concurrency.limit}"
+            )
+
+            try:
+                result = self._download_once(month, notify, ready)
+            finally:
+                self._log_round_concurrency(month, round_num)
             downloaded_all.extend(result.downloaded)
             skipped_all = result.skipped
 
-            missing = self._find_missing_zips(month)
+            missing = self._find_missing_zips(month, ready)
 
             if not missing:
                 print("[DOWNLOADER] Month download complete")
+                self._log_retry_summary()
+                self.telemetry.summary(month)
                 return DownloadResult(
                     downloaded=downloaded_all,
                     skipped=skipped_all,
@@ -85,53 +216,228 @@ class CNPJDownloader:
                 f"[DOWNLOADER] Month incomplete: "
                 f"{len(missing)} ZIPs missing"
             )
-            time.sleep(10)
+
+            # Progress this round: next wait starts from the base again
+            if result.downloaded:
+                rounds.reset()
+
+            if not rounds.backoff(
+                RuntimeError(f"{len(missing)} ZIPs missing")
+            ):
+                break
+
+        self._log_retry_summary()
+        self.telemetry.summary(month)
 
         raise RuntimeError(
             f"[DOWNLOADER] Failed to fully download month {month} "
             f"after {max_rounds} rounds"
         )
 
+    def list_month(self, month: str) -> list[RemoteZip]:
+        """
+        Relevant ZIPs listed for a month (cached listing).
+        """
+        return self._get_month_zips(month)
+
+    def seed_listing(
+        self,
+        month: str,
+        remote_zips: list[RemoteZip],
+    ) -> None:
+        """
+        Use a listing fetched elsewhere (e.g. by the finder) as the
+        cached listing of a month, saving a PROPFIND.
+        """
+        remote_zips = [
+            remote
+            for remote in remote_zips
+            if self._is_relevant_zip(remote.name)
+        ]
+
+        if remote_zips:
+            self._listing_cache[month] = (time.monotonic(), remote_zips)
+
+    def is_month_current(self, month: str) -> bool:
+        """
+        True if every listed ZIP was downloaded before, with a digest,
+        and has not changed remotely since. The files themselves may
+        have been removed after loading.
+        """
+        manifest = MonthManifest(self.raw_dir / month)
+        remote_zips = self._get_month_zips(month)
+
+        if not remote_zips:
+            return False
+
+        for remote in remote_zips:
+            entry = manifest.get(remote.name)
+
+            if (
+                entry is None
+                or not entry.get("digest")
+                or entry.get("size") != remote.size
+                or self._remote_changed(remote, entry)
+            ):
+                return False
+
+        return True
+
+    def inspect_file(
+        self,
+        month: str,
+        remote: RemoteZip,
+    ) -> tuple[str, int]:
+        """
+        Read-only view of a listed ZIP, for planning.
+        Returns (state, bytes to fetch) where state is "present",
+        "cached", "partial" or "missing".
+        """
+        out_path = self.raw_dir / month / remote.name
+        entry = MonthManifest(self.raw_dir / month).get(remote.name)
+        changed = entry is not None and self._remote_changed(remote, entry)
+
+        if (
+            out_path.exists()
+            and not changed
+            and (remote.size is None or out_path.stat().st_size == remote.size)
+        ):
+            return "present", 0
+
+        if self.cache is not None and self.cache.contains(
+            month, remote.name, remote.size, remote.etag
+        ):
+            return "cached", 0
+
+        size = remote.size or 0
+        part_path = self._part_path(out_path)
+
+        if part_path.exists() and not changed:
+            done = min(part_path.stat().st_size, size)
+            return "partial", size - done
+
+        return "missing", size
+
+    def _log_retry_summary(self) -> None:
+        summary = self.retry_policy.summary()
+
+        print(
+            f"[DOWNLOADER] Retries: {summary['retries']:.0f} "
+            f"(gave up {summary['gave_up']:.0f}, "
+            f"Retry-After honoured {summary['retry_after_honoured']:.0f}, "
+            f"waited {summary['total_wait']:.1f}s)"
+        )
+
+    def _log_round_concurrency(self, month: str, round_num: int) -> None:
+        stats = self.concurrency.round_stats(self._rounds.pop(month))
+
+        print(
+            f"[DOWNLOADER] {month} round {round_num} concurrency: "
+            f"final={stats.limit} range={stats.low}-{stats.high} "
+            f"throughput={stats.bytes_per_second / 1024 / 1024:.1f} MiB/s "
+            f"errors={stats.errors} latency_spikes={stats.latency_spikes}"
+        )
+
     # --------------------------------------------------------
     # CORE
     # --------------------------------------------------------
 
-    def _download_once(self, month: str) -> DownloadResult:
+    def _download_once(
+        self,
+        month: str,
+        notify: Callable[[Path], None],
+        delivered: set[Path] = frozenset(),
+    ) -> DownloadResult:
         print(f"[DOWNLOADER] Processing month {month}")
 
         month_dir = self.raw_dir / month
         self._ensure_dir(month_dir)
 
-        zip_names = self._list_month_zips(month)
+        remote_zips = self._get_month_zips(month)
+        manifest = MonthManifest(month_dir)
 
         downloaded: list[Path] = []
         skipped: list[Path] = []
-        tasks: list[tuple[str, Path]] = []
+        tasks: list[tuple[RemoteZip, Path]] = []
 
-        for name in zip_names:
-            out_path = month_dir / name
+        for remote in remote_zips:
+            out_path = month_dir / remote.name
 
-            if out_path.exists() and out_path.stat().st_size > 0:
+            if self._is_complete(remote, out_path, manifest, delivered):
                 skipped.append(out_path)
             else:
-                tasks.append((name, out_path))
+                tasks.append((remote, out_path))
+
+        # Persist entries adopted for pre-existing files
+        manifest.save()
+
+        for path in skipped:
+            notify(path)
 
         if not tasks:
             print("[DOWNLOADER] Nothing to download")
             return DownloadResult(downloaded, skipped)
 
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+        tasks = self._schedule(tasks)
+
+        downloaded = self._run_downloads(month, tasks, manifest, notify)
+
+        manifest.save()
+
+        return DownloadResult(downloaded, skipped)
+
+    def _schedule(
+        self,
+        tasks: list[tuple[RemoteZip, Path]],
+    ) -> list[tuple[RemoteZip, Path]]:
+        """
+        Order downloads largest first (LPT), so the biggest files are
+        not left to start last and stretch the month's tail.
+
+        In "dimensions" mode, dimension ZIPs (CNAE, municipios) go
+        first so their tables can be loaded early; the rest follow
+        largest first. Files without a listed size go last.
+        """
+        def key(task: tuple[RemoteZip, Path]) -> tuple[bool, int]:
+            remote = task[0]
+            dataset = dataset_for_zip(remote.name)
+
+            is_dim = dataset is not None and dataset.kind == "dim"
+
+            return (
+                self.priority == "dimensions" and not is_dim,
+                -(remote.size or 0),
+            )
+
+        return sorted(tasks, key=key)
+
+    def _run_downloads(
+        self,
+        month: str,
+        tasks: list[tuple[RemoteZip, Path]],
+        manifest: MonthManifest,
+        notify: Callable[[Path], None],
+    ) -> list[Path]:
+        """
+        Download tasks on a thread pool. Failures are logged and left
+        for the next round.
+        """
+        downloaded: list[Path] = []
+
+        with ThreadPoolExecutor(
+            max_workers=self.concurrency.capacity
+        ) as executor:
             futures = {}
 
-            for name, out_path in tasks:
-                url = self._build_file_url(month, name)
+            for remote, out_path in tasks:
                 futures[
                     executor.submit(
-                        self._download_file,
-                        url,
+                        self._download_task,
+                        month,
+                        remote,
                         out_path,
                     )
-                ] = name
+                ] = (remote, out_path)
 
             with tqdm(
                 total=len(futures),
@@ -139,49 +445,162 @@ class CNPJDownloader:
                 unit="file",
             ) as pbar:
                 for future in as_completed(futures):
-                    name = futures[future]
+                    remote, out_path = futures[future]
 
                     try:
-                        future.result()
-                        downloaded.append(month_dir / name)
+                        digest = future.result()
                     except Exception as exc:
                         print(
                             f"[DOWNLOADER] Failed to download "
-                            f"{name}: {exc}"
+                            f"{remote.name}: {exc}"
                         )
+                    else:
+                        downloaded.append(out_path)
+                        self._record_download(manifest, remote, digest)
+                        manifest.save()
+                        notify(out_path)
 
                     pbar.update(1)
 
-        return DownloadResult(downloaded, skipped)
+        return downloaded
 
     # --------------------------------------------------------
     # VALIDATION
     # --------------------------------------------------------
 
-    def _find_missing_zips(self, month: str) -> list[str]:
+    def _find_missing_zips(
+        self,
+        month: str,
+        delivered: set[Path] = frozenset(),
+    ) -> list[str]:
         """
-        Compare expected ZIPs vs files on disk.
+        Compare expected ZIPs vs files on disk and the local manifest.
         """
-        expected = self._list_month_zips(month)
+        expected = self._get_month_zips(month)
         month_dir = self.raw_dir / month
+        manifest = MonthManifest(month_dir)
 
         missing: list[str] = []
 
-        for name in expected:
-            path = month_dir / name
-            if not path.exists() or path.stat().st_size == 0:
-                missing.append(name)
+        for remote in expected:
+            path = month_dir / remote.name
+            if not self._is_complete(remote, path, manifest, delivered):
+                missing.append(remote.name)
 
         return missing
 
+    def _is_complete(
+        self,
+        remote: RemoteZip,
+        path: Path,
+        manifest: MonthManifest,
+        delivered: set[Path] = frozenset(),
+    ) -> bool:
+        """
+        Decide whether a local ZIP matches the listed remote file.
+
+        - Size must match getcontentlength when it is known.
+        - A manifest entry with a different ETag (or last-modified,
+          when no ETag is served) means the remote file changed.
+        - Files with a matching size but no manifest entry are adopted.
+
+        Stale or truncated files are removed so they are fetched again
+        before the extractor ever sees them.
+
+        delivered holds files already handed to on_file_ready in this
+        download_month call. The consumer may have loaded and removed
+        them (disk cleanup); they stay complete as long as the manifest
+        has their digest and the remote file did not change.
+        """
+        if not path.exists():
+            entry = manifest.get(remote.name)
+
+            return (
+                path in delivered
+                and entry is not None
+                and bool(entry.get("digest"))
+                and not self._remote_changed(remote, entry)
+            )
+
+        local_size = path.stat().st_size
+        entry = manifest.get(remote.name)
+
+        if local_size == 0:
+            stale = True
+        elif remote.size is not None and local_size != remote.size:
+            print(
+                f"[DOWNLOADER] Truncated file {remote.name}: "
+                f"{local_size}/{remote.size} bytes"
+            )
+            stale = True
+        elif entry is not None and self._remote_changed(remote, entry):
+            print(f"[DOWNLOADER] Remote file changed: {remote.name}")
+            self._part_path(path).unlink(missing_ok=True)
+            stale = True
+        else:
+            stale = False
+
+        if stale:
+            path.unlink(missing_ok=True)
+            manifest.remove(remote.name)
+            return False
+
+        if entry is None or not entry.get("digest"):
+            print(f"[DOWNLOADER] Hashing existing file {remote.name}")
+            self._record_download(manifest, remote, digest_file(path))
+
+        return True
+
+    def _remote_changed(self, remote: RemoteZip, entry: dict) -> bool:
+        if remote.etag and entry.get("etag"):
+            return remote.etag != entry["etag"]
+
+        if remote.last_modified and entry.get("last_modified"):
+            return remote.last_modified != entry["last_modified"]
+
+        return False
+
+    def _record_download(
+        self,
+        manifest: MonthManifest,
+        remote: RemoteZip,
+        digest: str,
+    ) -> None:
+        manifest.record(
+            remote.name,
+            size=remote.size,
+            etag=remote.etag,
+            last_modified=remote.last_modified,
+            digest=digest,
+            digest_algorithm=ALGORITHM,
+        )
+
     # --------------------------------------------------------
     # WEBDAV
     # --------------------------------------------------------
 
-    def _list_month_zips(self, month: str, retries: int = 5) -> list[str]:
+    def _get_month_zips(self, month: str) -> list[RemoteZip]:
+        """
+        Month listing shared by download and validation.
+        PROPFIND is only issued when the cached listing is older
+        than listing_ttl seconds.
+        """
+        cached = self._listing_cache.get(month)
+        now = time.monotonic()
+
+        if cached is not None and now - cached[0] < self.listing_ttl:
+            return cached[1]
+
+        remote_zips = self._list_month_zips(month)
+        self._listing_cache[month] = (time.monotonic(), remote_zips)
+
+        return remote_zips
+
+    def _list_month_zips(self, month: str) -> list[RemoteZip]:
         """
         List ZIP files available for a given month using WebDAV PROPFIND.
-        Highly retry-safe.
+        Highly retry-safe. Only size, ETag and last-modified are
+        requested, and the response is parsed as it streams in.
         """
         url = f"{self.WEBDAV_BASE}{self._build_month_dir(month)}/"
 
@@ -192,13 +611,18 @@ class CNPJDownloader:
             "Content-Type": "application/xml",
         }
 
-        body = b"""<?xml version="1.0"?>
-            <d:propfind xmlns:d="DAV:">
-                <d:allprop/>
-            </d:propfind>
-        """
+        body = propfind_body(
+            "getcontentlength",
+            "getetag",
+            "getlastmodified",
+        )
 
-        for attempt in range(1, retries + 1):
+        retry = self.retry_policy.start(
+            f"listing ZIPs for {month}",
+            max_attempts=5,
+        )
+
+        while True:
             try:
                 req = urllib.request.Request(
                     url,
@@ -207,63 +631,174 @@ class CNPJDownloader:
                     method="PROPFIND",
                 )
 
-                with urllib.request.urlopen(req, timeout=120) as resp:
-                    xml_data = resp.read()
-
-                tree = ET.fromstring(xml_data)
-
-                zip_names: list[str] = []
-
-                for elem in tree.findall(".//{DAV:}href"):
-                    name = elem.text.rstrip("/").split("/")[-1]
-
-                    if (
-                        name.lower().endswith(".zip")
-                        and self._is_relevant_zip(name)
-                    ):
-                        zip_names.append(name)
+                remote_zips: list[RemoteZip] = []
+
+                with self._open(req) as resp:
+                    for entry in iter_propfind(resp):
+                        if not (
+                            entry.name.lower().endswith(".zip")
+                            and self._is_relevant_zip(entry.name)
+                        ):
+                            continue
+
+                        length = entry.props.get("getcontentlength")
+
+                        remote_zips.append(
+                            RemoteZip(
+                                name=entry.name,
+                                size=int(length) if length else None,
+                                etag=entry.props.get("getetag"),
+                                last_modified=entry.props.get(
+                                    "getlastmodified"
+                                ),
+                            )
+                        )
 
-                if not zip_names:
+                if not remote_zips:
                     raise RuntimeError("No ZIPs found")
 
-                return zip_names
+                return remote_zips
 
             except Exception as exc:
-                if attempt == retries:
+                if not retry.backoff(exc):
                     raise RuntimeError(
                         f"Failed to list ZIPs for {month}"
                     ) from exc
 
-                wait = 3.0 * (attempt ** 2)
-                print(
-                    f"[DOWNLOADER] Retry {attempt}/{retries} "
-                    f"listing ZIPs for {month} "
-                    f"(waiting {wait:.1f}s)"
-                )
-                time.sleep(wait)
-
-        return []
-
     # --------------------------------------------------------
     # FILE DOWNLOAD
     # --------------------------------------------------------
 
+    def _download_task(
+        self,
+        month: str,
+        remote: RemoteZip,
+        out_path: Path,
+    ) -> str:
+        """
+        Fetch one file from the cache, or download it inside a
+        concurrency slot and add it to the cache.
+        Every call leaves a telemetry record.
+        Returns the file digest.
+        """
+        probe = TransferProbe(self._rounds.get(month))
+        started = time.monotonic()
+
+        if self.cache is not None:
+            digest = self.cache.fetch(
+                month, remote.name, remote.size, remote.etag, out_path
+            )
+
+            if digest is not None:
+                self.telemetry.record(
+                    month,
+                    remote.name,
+                    "cached",
+                    probe,
+                    time.monotonic() - started,
+                )
+                return digest
+
+        url = self._build_file_url(month, remote.name)
+
+        try:
+            with self.concurrency.slot():
+                started = time.monotonic()
+                digest = self._download_file(
+                    url, out_path, remote.size, probe
+                )
+        except Exception as exc:
+            probe.failed(exc)
+            self.telemetry.record(
+                month,
+                remote.name,
+                "failed",
+                probe,
+                time.monotonic() - started,
+            )
+            raise
+
+        self.telemetry.record(
+            month,
+            remote.name,
+            "ok",
+            probe,
+            time.monotonic() - started,
+        )
+
+        if self.cache is not None:
+            self.cache.store(
+                month, remote.name, remote.size, remote.etag, out_path, digest
+            )
+
+        return digest
+
     def _download_file(
         self,
         url: str,
         out_path: Path,
-        retries: int = 3,
-    ) -> None:
-        headers = {
-            "Authorization": self._auth_header(),
-            "User-Agent": "cnpj-getter",
-        }
+        expected_size: int | None = None,
+        probe: TransferProbe | None = None,
+    ) -> str:
+        """
+        Download a file into "<name>.part", resuming with HTTP Range
+        requests across retries (see RetryPolicy). The file is only
+        promoted to its final name once its size matches the expected
+        size.
+
+        Returns the block SHA-256 digest (see checksum.py), computed
+        while streaming. Resumed downloads are hashed from disk once
+        complete, since the earlier bytes were never seen by a hasher.
+        """
+        part_path = self._part_path(out_path)
+        self._ensure_dir(out_path.parent)
 
-        for attempt in range(1, retries + 1):
+        probe = probe or TransferProbe()
+
+        if self._should_segment(url, out_path, expected_size):
+            return self._download_segmented(
+                url, out_path, expected_size, probe
+            )
+
+        # A segmented ".part" is preallocated to full size: its length
+        # says nothing about what was written, so it cannot be resumed
+        segments_path = self._segments_path(out_path)
+
+        if segments_path.exists():
+            print(
+                f"[DOWNLOADER] Discarding segmented partial download "
+                f"of {out_path.name}"
+            )
+            part_path.unlink(missing_ok=True)
+            segments_path.unlink(missing_ok=True)
+
+        retry = self.retry_policy.start(f"download {out_path.name}")
+
+        while True:
             try:
+                offset = self._resume_offset(part_path, expected_size)
+
+                if expected_size is not None and offset == expected_size:
+                    part_path.replace(out_path)
+                    return digest_file(out_path)
+
+                headers = {
+                    "Authorization": self._auth_header(),
+                    "User-Agent": "cnpj-getter",
+                }
+
+                if offset > 0:
+                    headers["Range"] = f"bytes={offset}-"
+
                 req = urllib.request.Request(url, headers=headers)
+                started = time.monotonic()
+                probe.request()
+
+                with self._open(req) as resp:
+                    latency = time.monotonic() - started
+                    self.concurrency.record_latency(latency, probe.round)
+                    probe.response(resp.status, latency)
 
-                with urllib.request.urlopen(req, timeout=120) as resp:
                     content_type = resp.headers.get(
                         "Content-Type", ""
                     ).lower()
@@ -273,13 +808,30 @@ class CNPJDownloader:
                             f"Expected ZIP, got {content_type}"
                         )
 
-                    total_bytes = resp.headers.get("Content-Length")
-                    total = int(total_bytes) if total_bytes else None
+                    # Server ignored the Range header: start over
+                    if offset > 0 and resp.status != 206:
+                        offset = 0
 
-                    self._ensure_dir(out_path.parent)
+                    total = self._response_total_size(resp, offset)
 
-                    with out_path.open("wb") as f, tqdm(
+                    if total is None:
+                        total = expected_size
+                    elif (
+                        expected_size is not None
+                        and total != expected_size
+                    ):
+                        print(
+                            f"[DOWNLOADER] Size mismatch for "
+                            f"{out_path.name}: listed {expected_size}, "
+                            f"served {total}"
+                        )
+
+                    mode = "ab" if offset > 0 else "wb"
+                    hasher = BlockHasher() if offset == 0 else None
+
+                    with part_path.open(mode) as f, tqdm(
                         total=total,
+                        initial=offset,
                         unit="B",
                         unit_scale=True,
                         unit_divisor=1024,
@@ -292,33 +844,437 @@ class CNPJDownloader:
                                 break
                             f.write(chunk)
                             pbar.update(len(chunk))
+                            probe.received(len(chunk))
+                            self.concurrency.record_bytes(
+                                len(chunk), probe.round
+                            )
+                            self.bandwidth.consume(len(chunk))
 
-                return
+                            if hasher is not None:
+                                hasher.update(chunk)
 
-            except (
-                urllib.error.URLError,
-                TimeoutError,
-                ConnectionResetError,
-                RuntimeError,
-            ):
-                if out_path.exists():
-                    out_path.unlink(missing_ok=True)
+                self._promote_part(part_path, out_path, total)
+
+                if hasher is None:
+                    return digest_file(out_path)
+
+                return combine_blocks(hasher.finish())
+
+            except (*RETRYABLE_ERRORS, RuntimeError) as exc:
+                self.concurrency.record_error(probe.round)
+                probe.failed(exc)
+
+                # 416: our offset is past what the server has; restart
+                if (
+                    isinstance(exc, urllib.error.HTTPError)
+                    and exc.code == 416
+                ):
+                    part_path.unlink(missing_ok=True)
 
-                if attempt == retries:
+                if not retry.backoff(exc):
                     raise
 
-                wait = 3.0 * (attempt ** 2)
-                print(
-                    f"[DOWNLOADER] Retry {attempt}/{retries} "
-                    f"for {out_path.name} "
-                    f"(waiting {wait:.1f}s)"
+    def _resume_offset(
+        self,
+        part_path: Path,
+        expected_size: int | None,
+    ) -> int:
+        """
+        Return how many bytes of a partial download can be reused.
+        """
+        if not part_path.exists():
+            return 0
+
+        size = part_path.stat().st_size
+
+        if expected_size is not None and size > expected_size:
+            part_path.unlink(missing_ok=True)
+            return 0
+
+        return size
+
+    def _response_total_size(self, resp, offset: int) -> int | None:
+        """
+        Full file size announced by the server, if any.
+        """
+        content_range = resp.headers.get("Content-Range")
+
+        # e.g. "bytes 100-199/200"
+        if content_range and "/" in content_range:
+            total = content_range.rsplit("/", 1)[-1].strip()
+            if total.isdigit():
+                return int(total)
+
+        content_length = resp.headers.get("Content-Length")
+
+        if content_length:
+            return offset + int(content_length)
+
+        return None
+
+    def _promote_part(
+        self,
+        part_path: Path,
+        out_path: Path,
+        total: int | None,
+    ) -> None:
+        """
+        Rename "<name>.part" to its final name if the size is complete.
+        Incomplete parts are kept so the next attempt can resume.
+        """
+        size = part_path.stat().st_size
+
+        if total is not None and size != total:
+            if size > total:
+                part_path.unlink(missing_ok=True)
+
+            raise RuntimeError(
+                f"Incomplete download for {out_path.name}: "
+                f"{size}/{total} bytes"
+            )
+
+        part_path.replace(out_path)
+
+    # --------------------------------------------------------
+    # SEGMENTED DOWNLOAD
+    # --------------------------------------------------------
+
+    def _should_segment(
+        self,
+        url: str,
+        out_path: Path,
+        expected_size: int | None,
+    ) -> bool:
+        """
+        Use parallel byte-range segments for large files of known size.
+        A plain ".part" left by a single-stream download is resumed as is.
+        """
+        if self.segments_per_file < 2 or expected_size is None:
+            return False
+
+        if expected_size < 2 * self.min_segment_size:
+            return False
+
+        part_path = self._part_path(out_path)
+        segments_path = self._segments_path(out_path)
+
+        if part_path.exists() and not segments_path.exists():
+            return False
+
+        return self._supports_ranges(url)
+
+    def _supports_ranges(self, url: str) -> bool:
+        """
+        Probe once whether the server answers Range requests with 206.
+        A probe that keeps failing disables segmenting for this file
+        only; the next file probes again.
+        """
+        with self._ranges_lock:
+            if self._ranges_supported is None:
+                headers = {
+                    "Authorization": self._auth_header(),
+                    "User-Agent": "cnpj-getter",
+                    "Range": "bytes=0-0",
+                }
+
+                retry = self.retry_policy.start("range probe")
+
+                while self._ranges_supported is None:
+                    req = urllib.request.Request(url, headers=headers)
+
+                    try:
+                        with self._open(req) as resp:
+                            self._ranges_supported = resp.status == 206
+
+                            # Read the byte so the connection is reused
+                            if self._ranges_supported:
+                                resp.read()
+                    except (
+                        urllib.error.URLError,
+                        http.client.HTTPException,
+                        TimeoutError,
+                        ConnectionResetError,
+                    ) as exc:
+                        if not retry.backoff(exc):
+                            print(f"[DOWNLOADER] Range probe failed: {exc}")
+                            return False
+
+                if not self._ranges_supported:
+                    print(
+                        "[DOWNLOADER] Server ignores Range requests, "
+                        "segmented download disabled"
+                    )
+
+            return self._ranges_supported
+
+    def _plan_segments(self, size: int) -> list[tuple[int, int]]:
+        """
+        Split [0, size) into inclusive (start, end) byte ranges.
+        """
+        count = max(
+            1,
+            min(self.segments_per_file, size // self.min_segment_size),
+        )
+        step = size // count
+
+        segments: list[tuple[int, int]] = []
+
+        for index in range(count):
+            start = index * step
+            end = size - 1 if index == count - 1 else start + step - 1
+            segments.append((start, end))
+
+        return segments
+
+    def _download_segmented(
+        self,
+        url: str,
+        out_path: Path,
+        size: int,
+        probe: TransferProbe,
+    ) -> str:
+        """
+        Download byte-range segments concurrently into a preallocated
+        ".part" file. Per-segment progress is kept in "<name>.part.json"
+        so an interrupted file resumes each segment where it stopped.
+
+        Each segment hashes the checksum blocks that lie wholly inside
+        it while streaming. Blocks across segment boundaries, and those
+        of segments that had to resume mid-way, are hashed from disk.
+        """
+        part_path = self._part_path(out_path)
+        segments_path = self._segments_path(out_path)
+        segments = self._plan_segments(size)
+        probe.segments = len(segments)
+
+        done = self._read_segments_state(segments_path, size, segments)
+
+        if done is None:
+            done = [0] * len(segments)
+            self._preallocate(part_path, size)
+
+        # A hasher only covers a segment streamed from its first byte
+        hashers: list[BlockHasher | None] = [
+            BlockHasher(start) if done[index] == 0 else None
+            for index, (start, _) in enumerate(segments)
+        ]
+
+        state_lock = threading.Lock()
+
+        def save_state() -> None:
+            with state_lock:
+                self._write_segments_state(segments_path, size, done)
+
+        save_state()
+
+        with tqdm(
+            total=size,
+            initial=sum(done),
+            unit="B",
+            unit_scale=True,
+            unit_divisor=1024,
+            desc=f"{out_path.name} x{len(segments)}",
+            leave=False,
+        ) as pbar, ThreadPoolExecutor(
+            max_workers=len(segments)
+        ) as executor:
+            futures = [
+                executor.submit(
+                    self._download_segment,
+                    url,
+                    part_path,
+                    index,
+                    start,
+                    end,
+                    done,
+                    hashers,
+                    pbar,
+                    probe,
                 )
-                time.sleep(wait)
+                for index, (start, end) in enumerate(segments)
+            ]
+
+            errors: list[BaseException] = []
+
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as exc:
+                    errors.append(exc)
+                finally:
+                    save_state()
+
+        if errors:
+            raise errors[0]
+
+        self._promote_part(part_path, out_path, size)
+        segments_path.unlink(missing_ok=True)
+
+        blocks: dict[int, bytes] = {}
+
+        for hasher, (_, end) in zip(hashers, segments):
+            if hasher is not None:
+                blocks.update(hasher.finish(at_end=end == size - 1))
+
+        return digest_file(out_path, blocks)
+
+    def _download_segment(
+        self,
+        url: str,
+        part_path: Path,
+        index: int,
+        start: int,
+        end: int,
+        done: list[int],
+        hashers: list[BlockHasher | None],
+        pbar: tqdm,
+        probe: TransferProbe,
+    ) -> None:
+        """
+        Fetch bytes [start + done[index], end] and write them in place.
+        """
+        length = end - start + 1
+
+        retry = self.retry_policy.start(
+            f"download {part_path.name} segment {index}"
+        )
+
+        while True:
+            if done[index] >= length:
+                return
+
+            # Resuming mid-segment: earlier bytes were hashed by no one
+            if done[index] > 0:
+                hashers[index] = None
+
+            offset = start + done[index]
+
+            headers = {
+                "Authorization": self._auth_header(),
+                "User-Agent": "cnpj-getter",
+                "Range": f"bytes={offset}-{end}",
+            }
+
+            try:
+                req = urllib.request.Request(url, headers=headers)
+                started = time.monotonic()
+                probe.request()
+
+                with self._open(req) as resp:
+                    latency = time.monotonic() - started
+                    self.concurrency.record_latency(latency, probe.round)
+                    probe.response(resp.status, latency)
+
+                    if resp.status != 206:
+                        raise RuntimeError(
+                            f"Expected 206 for segment {index}, "
+                            f"got {resp.status}"
+                        )
+
+                    with part_path.open("r+b") as f:
+                        f.seek(offset)
+
+                        while done[index] < length:
+                            chunk = resp.read(
+                                min(1024 * 1024, length - done[index])
+                            )
+                            if not chunk:
+                                break
+                            f.write(chunk)
+                            done[index] += len(chunk)
+                            pbar.update(len(chunk))
+                            probe.received(len(chunk))
+                            self.concurrency.record_bytes(
+                                len(chunk), probe.round
+                            )
+                            self.bandwidth.consume(len(chunk))
+
+                            hasher = hashers[index]
+                            if hasher is not None:
+                                hasher.update(chunk)
+
+                if done[index] < length:
+                    raise RuntimeError(
+                        f"Segment {index} incomplete: "
+                        f"{done[index]}/{length} bytes"
+                    )
+
+                return
+
+            except (*RETRYABLE_ERRORS, RuntimeError) as exc:
+                self.concurrency.record_error(probe.round)
+                probe.failed(exc)
+
+                if not retry.backoff(exc):
+                    raise
+
+    def _preallocate(self, path: Path, size: int) -> None:
+        with path.open("wb") as f:
+            if hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(f.fileno(), 0, size)
+                    return
+                except OSError:
+                    pass
+
+            f.truncate(size)
+
+    def _read_segments_state(
+        self,
+        segments_path: Path,
+        size: int,
+        segments: list[tuple[int, int]],
+    ) -> list[int] | None:
+        """
+        Return per-segment progress if it matches the current plan.
+        """
+        if not segments_path.exists():
+            return None
+
+        part_path = segments_path.with_suffix("")
+
+        try:
+            state = json.loads(segments_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+        done = state.get("done")
+
+        if (
+            state.get("size") != size
+            or not isinstance(done, list)
+            or len(done) != len(segments)
+            or not part_path.exists()
+            or part_path.stat().st_size != size
+        ):
+            return None
+
+        return [int(value) for value in done]
+
+    def _write_segments_state(
+        self,
+        segments_path: Path,
+        size: int,
+        done: list[int],
+    ) -> None:
+        tmp_path = segments_path.with_name(f"{segments_path.name}.tmp")
+        tmp_path.write_text(
+            json.dumps({"size": size, "done": done}),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, segments_path)
 
     # --------------------------------------------------------
     # HELPERS
     # --------------------------------------------------------
 
+    def _open(self, req: urllib.request.Request):
+        """
+        Send a request over the connection pool and return the
+        response as a context manager.
+        """
+        return self.pool.request(req)
+
     def _build_month_dir(self, month: str) -> str:
         return f"/Dados/Cadastros/CNPJ/{month}"
 
@@ -334,14 +1290,14 @@ class CNPJDownloader:
         ).decode()
         return f"Basic {auth}"
 
+    def _part_path(self, out_path: Path) -> Path:
+        return out_path.with_name(f"{out_path.name}.part")
+
+    def _segments_path(self, out_path: Path) -> Path:
+        return out_path.with_name(f"{out_path.name}.part.json")
+
     def _ensure_dir(self, path: Path) -> None:
         path.mkdir(parents=True, exist_ok=True)
 
     def _is_relevant_zip(self, name: str) -> bool:
-        name = name.lower()
-        return (
-            name.startswith("estabelecimentos")
-            or name.startswith("empresas")
-            or name.startswith("cnae")
-            or name.startswith("municipios")
-        )
+        return dataset_for_zip(name) is not None
@@ -0,0 +1,99 @@
+from dataclasses import dataclass
+from typing import BinaryIO
+import codecs
+import re
+
+
+# Receita publishes the CSVs in ISO-8859-1
+SOURCE_ENCODING = "latin-1"
+
+# Keeps newlines, maps non-ASCII bytes to "x" and drops the rest, so a
+# line holding non-ASCII bytes becomes one run of "x"
+_LINE_MARKS = bytes(
+    byte if byte == 0x0A else (0x78 if byte >= 0x80 else 0)
+    for byte in range(256)
+)
+_ASCII_TEXT = bytes(byte for byte in range(0x80) if byte != 0x0A)
+_MARK_RUN = re.compile(rb"x+")
+
+
+# ============================================================
+# RESULT
+# ============================================================
+
+@dataclass(frozen=True)
+class TranscodeStats:
+    """
+    Rows seen while transcoding a CSV to UTF-8.
+
+    - rows   : lines written
+    - rescued: lines with non-ASCII bytes in source chunks that were
+               not valid UTF-8, which read_csv(ignore_errors=true)
+               used to drop silently
+    """
+    rows: int
+    rescued: int
+
+
+# ============================================================
+# TRANSCODING
+# ============================================================
+
+def transcode(
+    src: BinaryIO,
+    dst: BinaryIO,
+    chunk_size: int = 1024 * 1024,
+) -> TranscodeStats:
+    """
+    Copy a Latin-1 stream to dst as UTF-8, chunk by chunk, counting
+    the rows that are rescued along the way. Memory stays bounded by
+    chunk_size plus one line.
+    """
+    decoder = codecs.getincrementaldecoder(SOURCE_ENCODING)()
+
+    rows = 0
+    rescued = 0
+    tail = b""
+
+    while True:
+        chunk = src.read(chunk_size)
+
+        if not chunk:
+            break
+
+        dst.write(decoder.decode(chunk).encode("utf-8"))
+
+        # Count on the source bytes; the common cases stay in C
+        rows += chunk.count(b"\n")
+        cut = chunk.rfind(b"\n") + 1
+
+        if not cut:
+            tail += chunk
+            continue
+
+        if not chunk.isascii():
+            rescued += _count_rescued(tail + chunk[:cut])
+        elif not tail.isascii():
+            rescued += _count_rescued(tail + chunk[:chunk.find(b"\n")])
+
+        tail = chunk[cut:]
+
+    dst.write(decoder.decode(b"", final=True).encode("utf-8"))
+
+    if tail:
+        rows += 1
+        rescued += _count_rescued(tail)
+
+    return TranscodeStats(rows=rows, rescued=rescued)
+
+
+def _count_rescued(data: bytes) -> int:
+    """
+    Lines of data holding non-ASCII bytes, or 0 if data is valid UTF-8.
+    """
+    try:
+        data.decode("utf-8")
+    except UnicodeDecodeError:
+        return len(_MARK_RUN.findall(data.translate(_LINE_MARKS, _ASCII_TEXT)))
+
+    return 0
@@ -1,6 +1,16 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
 from pathlib import Path
 from zipfile import ZipFile, BadZipFile
+import os
+import threading
+
+import duckdb
+from tqdm import tqdm
+
+from app.pipeline.datasets import Dataset, dataset_for_file, dataset_for_zip
+from app.pipeline.encoding import transcode
+from app.pipeline.manifest import MonthManifest
 
 
 # ============================================================
@@ -25,15 +35,40 @@ class CNPJExtractor:
     """
     Extract ZIP files downloaded from CNPJ WebDAV.
     Fail-soft: invalid ZIPs are skipped and removed.
+
+    Each extraction is recorded in extracted/<month>/manifest.json:
+    the ZIP's digest, size and mtime, and the size and CRC-32 of every
+    member written. A ZIP is skipped when it matches what was last
+    extracted from it (digest, or size and mtime without one) and its
+    outputs are still on disk with the recorded sizes.
+
+    Members are written as UTF-8 (the source is Latin-1), decoded in
+    chunks while they are inflated. Rows that were not valid UTF-8,
+    and so were silently dropped by read_csv before, are counted and
+    reported as rescued.
+
+    With parquet, each CSV is then converted to <name>.parquet (ZSTD,
+    dataset column names) and the CSV is removed.
+
+    With processes > 1, extract_month inflates ZIPs in parallel worker
+    processes (largest first). Workers only write CSVs; the manifest
+    is updated by the parent.
     """
 
     def __init__(
         self,
         raw_dir: Path,
         extracted_dir: Path,
+        processes: int = 1,
+        parquet: bool = False,
     ) -> None:
         self.raw_dir = raw_dir
         self.extracted_dir = extracted_dir
+        self.processes = processes
+        self.parquet = parquet
+
+        # Guards extracted/<month>/manifest.json across threads
+        self._manifest_lock = threading.Lock()
 
     # --------------------------------------------------------
     # PUBLIC API
@@ -54,32 +89,32 @@ class CNPJExtractor:
         skipped: list[Path] = []
         failed: list[Path] = []
 
-        zip_paths = sorted(raw_month_dir.glob("*.zip"))
+        zip_paths = [
+            path
+            for path in sorted(raw_month_dir.glob("*.zip"))
+            if dataset_for_zip(path.name) is not None
+        ]
 
         if not zip_paths:
             print("[EXTRACT] No ZIP files found")
             return ExtractResult(extracted, skipped, failed)
 
-        for zip_path in zip_paths:
-            try:
-                with ZipFile(zip_path, "r") as zf:
-                    zf.extractall(extracted_month_dir)
-
-                    for name in zf.namelist():
-                        extracted.append(extracted_month_dir / name)
+        if self.processes > 1 and len(zip_paths) > 1:
+            results = self._extract_parallel(month, zip_paths)
+        else:
+            results = [
+                self.extract_zip(month, zip_path) for zip_path in zip_paths
+            ]
 
-            except BadZipFile:
-                print(f"[EXTRACT] Invalid ZIP removed: {zip_path.name}")
-                zip_path.unlink(missing_ok=True)
-                failed.append(zip_path)
-
-            except Exception as exc:
-                print(f"[EXTRACT] Failed to extract {zip_path.name}: {exc}")
-                failed.append(zip_path)
+        for result in results:
+            extracted.extend(result.extracted_files)
+            skipped.extend(result.skipped_files)
+            failed.extend(result.failed_files)
 
         print(
             f"[EXTRACT] Completed: "
             f"{len(extracted)} files extracted, "
+            f"{len(skipped)} ZIPs unchanged, "
             f"{len(failed)} ZIPs failed"
         )
 
@@ -89,9 +124,379 @@ class CNPJExtractor:
             failed_files=failed,
         )
 
+    def extract_zip(self, month: str, zip_path: Path) -> ExtractResult:
+        """
+        Extract a single ZIP file into extracted/<month>.
+        """
+        extracted_month_dir = self.extracted_dir / month
+        self._ensure_dir(extracted_month_dir)
+
+        source = self._source_state(month, zip_path)
+
+        if self._is_unchanged(month, zip_path, source):
+            print(f"[EXTRACT] Unchanged, skipped: {zip_path.name}")
+            return ExtractResult(
+                extracted_files=[],
+                skipped_files=[zip_path],
+                failed_files=[],
+            )
+
+        try:
+            members = _extract_members(
+                zip_path, extracted_month_dir, self.parquet
+            )
+        except Exception as exc:
+            return self._failed(zip_path, exc)
+
+        return self._extracted(month, zip_path, source, members)
+
+    def is_extracted(self, month: str, zip_path: Path) -> bool:
+        """
+        True if extract_zip would skip this ZIP as unchanged.
+        """
+        return self._is_unchanged(
+            month, zip_path, self._source_state(month, zip_path)
+        )
+
+    def extracted_members(self, month: str, zip_path: Path) -> list[Path]:
+        """
+        Files last extracted from a ZIP, per the extraction manifest.
+        """
+        extracted_month_dir = self.extracted_dir / month
+
+        with self._manifest_lock:
+            entry = MonthManifest(extracted_month_dir).get(zip_path.name)
+
+        if entry is None:
+            return []
+
+        return [extracted_month_dir / name for name in entry["members"]]
+
+    # --------------------------------------------------------
+    # PARALLEL
+    # --------------------------------------------------------
+
+    def _extract_parallel(
+        self,
+        month: str,
+        zip_paths: list[Path],
+    ) -> list[ExtractResult]:
+        """
+        Extract ZIPs on a process pool, largest first.
+        Results are returned in zip_paths order.
+        """
+        extracted_month_dir = self.extracted_dir / month
+        results: dict[Path, ExtractResult] = {}
+
+        with ProcessPoolExecutor(
+            max_workers=self.processes
+        ) as executor, tqdm(
+            total=len(zip_paths),
+            desc=f"Extracting ZIP files x{self.processes}",
+            unit="file",
+        ) as pbar:
+            futures = {}
+
+            for zip_path in sorted(
+                zip_paths,
+                key=lambda path: path.stat().st_size,
+                reverse=True,
+            ):
+                source = self._source_state(month, zip_path)
+
+                if self._is_unchanged(month, zip_path, source):
+                    print(f"[EXTRACT] Unchanged, skipped: {zip_path.name}")
+                    results[zip_path] = ExtractResult([], [zip_path], [])
+                    pbar.update(1)
+                    continue
+
+                future = executor.submit(
+                    _extract_members,
+                    zip_path,
+                    extracted_month_dir,
+                    self.parquet,
+                )
+                futures[future] = (zip_path, source)
+
+            for future in as_completed(futures):
+                zip_path, source = futures[future]
+
+                try:
+                    members = future.result()
+                except Exception as exc:
+                    results[zip_path] = self._failed(zip_path, exc)
+                else:
+                    results[zip_path] = self._extracted(
+                        month, zip_path, source, members
+                    )
+
+                pbar.update(1)
+
+        return [results[zip_path] for zip_path in zip_paths]
+
+    # --------------------------------------------------------
+    # RESULTS
+    # --------------------------------------------------------
+
+    def _extracted(
+        self,
+        month: str,
+        zip_path: Path,
+        source: dict,
+        members: dict[str, dict],
+    ) -> ExtractResult:
+        try:
+            self._record_extraction(month, zip_path, source, members)
+        except OSError as exc:
+            return self._failed(zip_path, exc)
+
+        rows = sum(output["rows"] for output in members.values())
+        rescued = sum(output["rescued"] for output in members.values())
+
+        print(
+            f"[EXTRACT] Extracted {zip_path.name}: {len(members)} files, "
+            f"{rows} rows, {rescued} rescued from Latin-1"
+        )
+
+        return ExtractResult(
+            extracted_files=[
+                self.extracted_dir / month / name for name in members
+            ],
+            skipped_files=[],
+            failed_files=[],
+        )
+
+    def _failed(self, zip_path: Path, exc: Exception) -> ExtractResult:
+        if isinstance(exc, BadZipFile):
+            print(f"[EXTRACT] Invalid ZIP removed: {zip_path.name}")
+            zip_path.unlink(missing_ok=True)
+        else:
+            print(f"[EXTRACT] Failed to extract {zip_path.name}: {exc}")
+
+        return ExtractResult(
+            extracted_files=[],
+            skipped_files=[],
+            failed_files=[zip_path],
+        )
+
+    # --------------------------------------------------------
+    # MANIFEST
+    # --------------------------------------------------------
+
+    def _source_digest(self, month: str, zip_path: Path) -> str | None:
+        """
+        Digest recorded by the downloader, so the ZIP is not re-read.
+        """
+        entry = MonthManifest(self.raw_dir / month).get(zip_path.name)
+
+        if entry is None:
+            return None
+
+        return entry.get("digest")
+
+    def _source_state(self, month: str, zip_path: Path) -> dict:
+        """
+        Digest, size and mtime identifying the ZIP being extracted.
+        """
+        stat = zip_path.stat()
+
+        return {
+            "digest": self._source_digest(month, zip_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    def _is_unchanged(self, month: str, zip_path: Path, source: dict) -> bool:
+        extracted_month_dir = self.extracted_dir / month
+
+        with self._manifest_lock:
+            entry = MonthManifest(extracted_month_dir).get(zip_path.name)
+
+        if entry is None or "members" not in entry:
+            return False
+
+        # Extracted before transcoding: outputs are still Latin-1
+        if entry.get("encoding") != "utf-8":
+            return False
+
+        # Output format toggled since (CSV <-> Parquet)
+        if entry.get("parquet", False) != self.parquet:
+            return False
+
+        if not self._same_source(zip_path, source, entry):
+            return False
+
+        outputs = entry.get("outputs", {})
+
+        for name in entry["members"]:
+            path = extracted_month_dir / name
+
+            if not path.exists():
+                return False
+
+            # A truncated or rewritten CSV no longer matches its member
+            expected = outputs.get(name)
+
+            if expected and path.stat().st_size != expected["size"]:
+                return False
+
+        return True
+
+    def _same_source(self, zip_path: Path, source: dict, entry: dict) -> bool:
+        """
+        Compare a ZIP with the one last extracted: by digest when both
+        are known, else by size and mtime. A ZIP only touched since
+        (same size, new mtime) still matches if its members' CRC-32s
+        in the central directory are the recorded ones.
+        """
+        if source["digest"] and entry.get("digest"):
+            return source["digest"] == entry["digest"]
+
+        if source["size"] != entry.get("size"):
+            return False
+
+        if source["mtime_ns"] == entry.get("mtime_ns"):
+            return True
+
+        outputs = entry.get("outputs")
+
+        if not outputs:
+            return False
+
+        expected = {
+            output.get("member", name): output["crc"]
+            for name, output in outputs.items()
+        }
+
+        try:
+            with ZipFile(zip_path, "r") as zf:
+                crcs = {
+                    info.filename: f"{info.CRC:08x}"
+                    for info in zf.infolist()
+                    if info.filename in expected
+                }
+        except (OSError, BadZipFile):
+            return False
+
+        return crcs == expected
+
+    def _record_extraction(
+        self,
+        month: str,
+        zip_path: Path,
+        source: dict,
+        members: dict[str, dict],
+    ) -> None:
+        extracted_month_dir = self.extracted_dir / month
+
+        with self._manifest_lock:
+            manifest = MonthManifest(extracted_month_dir)
+            previous = manifest.get(zip_path.name) or {}
+
+            # Outputs of an earlier extraction in another format would
+            # be loaded alongside the new ones
+            for name in previous.get("members", []):
+                if name not in members:
+                    (extracted_month_dir / name).unlink(missing_ok=True)
+
+            manifest.record(
+                zip_path.name,
+                **source,
+                encoding="utf-8",
+                parquet=self.parquet,
+                members=list(members),
+                outputs=members,
+            )
+            manifest.save()
+
     # --------------------------------------------------------
     # INTERNALS
     # --------------------------------------------------------
 
     def _ensure_dir(self, path: Path) -> None:
         path.mkdir(parents=True, exist_ok=True)
+
+
+def _extract_members(
+    zip_path: Path,
+    out_dir: Path,
+    parquet: bool = False,
+) -> dict[str, dict]:
+    """
+    Extract the members some registered dataset consumes as UTF-8,
+    optionally converting each to Parquet. Returns, per output file,
+    the member it came from, the output size, the member CRC-32 and
+    the transcoding row counts.
+    Module level so it can run in a worker process.
+    """
+    outputs: dict[str, dict] = {}
+
+    with ZipFile(zip_path, "r") as zf:
+        for info in zf.infolist():
+            dataset = dataset_for_file(info.filename)
+
+            if dataset is None:
+                continue
+
+            # Flat output, as Receita's ZIPs are; no path traversal
+            path = out_dir / Path(info.filename).name
+
+            with zf.open(info) as src, path.open("wb") as dst:
+                stats = transcode(src, dst)
+
+            if parquet:
+                path = _to_parquet(path, dataset)
+
+            outputs[path.name] = {
+                "member": info.filename,
+                "size": path.stat().st_size,
+                "crc": f"{info.CRC:08x}",
+                "rows": stats.rows,
+                "rescued": stats.rescued,
+            }
+
+    return outputs
+
+
+def _to_parquet(csv_path: Path, dataset: Dataset) -> Path:
+    """
+    Convert a UTF-8 CSV to <name>.parquet and remove the CSV.
+    """
+    parquet_path = csv_path.with_name(f"{csv_path.name}.parquet")
+    tmp_path = csv_path.with_name(f"{csv_path.name}.parquet.tmp")
+
+    columns = ", ".join(
+        f"'{column}': 'VARCHAR'" for column in dataset.columns
+    )
+
+    conn = duckdb.connect()
+
+    try:
+        conn.execute(
+            f"""
+            COPY (
+                SELECT *
+                FROM read_csv(
+                    {_sql_string(csv_path)},
+                    sep=';',
+                    header=false,
+                    ignore_errors=true,
+                    columns={{{columns}}}
+                )
+            ) TO {_sql_string(tmp_path)} (
+                FORMAT parquet,
+                COMPRESSION zstd
+            )
+            """
+        )
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, parquet_path)
+    csv_path.unlink()
+
+    return parquet_path
+
+
+def _sql_string(path: Path) -> str:
+    return "'" + str(path).replace("'", "''") + "'"
@@ -0,0 +1,94 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+
+
+# ============================================================
+# MANIFEST
+# ============================================================
+
+class MonthManifest:
+    """
+    Local record of the ZIP files downloaded for one month.
+
+    Stored as "manifest.json" inside raw/<month>. Each entry is keyed
+    by file name and holds the remote metadata the file was fetched
+    with (size, ETag, last-modified) and its digest.
+
+    The extractor keeps the same structure in extracted/<month>,
+    keyed by ZIP name, to remember what each ZIP produced.
+    """
+
+    FILENAME = "manifest.json"
+
+    def __init__(self, month_dir: Path) -> None:
+        self.path = month_dir / self.FILENAME
+        self.entries: dict[str, dict] = self._read()
+
+    # --------------------------------------------------------
+    # PUBLIC API
+    # --------------------------------------------------------
+
+    def get(self, name: str) -> dict | None:
+        return self.entries.get(name)
+
+    def record(self, name: str, **fields) -> None:
+        """
+        Merge fields into the entry for a file.
+        """
+        entry = self.entries.setdefault(name, {})
+        entry.update(fields)
+
+    def remove(self, name: str) -> None:
+        self.entries.pop(name, None)
+
+    def month_digest(self) -> str | None:
+        """
+        Digest over all file digests of the month.
+        None if any file has no digest yet.
+        """
+        if not self.entries:
+            return None
+
+        combined = hashlib.sha256()
+
+        for name in sorted(self.entries):
+            digest = self.entries[name].get("digest")
+
+            if not digest:
+                return None
+
+            combined.update(f"{name}:{digest}\n".encode())
+
+        return combined.hexdigest()
+
+    def save(self) -> None:
+        """
+        Write the manifest atomically.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+
+        os.replace(tmp_path, self.path)
+
+    # --------------------------------------------------------
+    # INTERNALS
+    # --------------------------------------------------------
+
+    def _read(self) -> dict[str, dict]:
+        if not self.path.exists():
+            return {}
+
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            print(f"[MANIFEST] Ignoring unreadable {self.path}")
+            return {}
+
+        return data if isinstance(data, dict) else {}
@@ -0,0 +1,246 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import http.client
+import random
+import threading
+import time
+import urllib.error
+
+
+# Transient failures worth another attempt. A connection dropped while
+# a body streams in surfaces as a bare ConnectionResetError, not as
+# the URLError urlopen raises when connecting.
+RETRYABLE_ERRORS = (
+    urllib.error.URLError,
+    http.client.IncompleteRead,
+    TimeoutError,
+    ConnectionResetError,
+)
+
+
+# ============================================================
+# METRICS
+# ============================================================
+
+@dataclass(frozen=True)
+class AttemptRecord:
+    """
+    One failed attempt and the wait that followed it.
+    """
+    operation: str
+    attempt: int
+    error: str
+    wait: float
+    elapsed: float
+    retry_after: float | None
+    gave_up: bool
+
+
+# ============================================================
+# POLICY
+# ============================================================
+
+class RetryPolicy:
+    """
+    Retry policy shared by WebDAV listings, file downloads and the
+    month finder.
+
+    - Exponential backoff with jitter (between half and the full
+      delay), so instances that fail together do not retry in lockstep.
+    - Retry-After (seconds or HTTP date) is honoured as a lower bound.
+    - max_elapsed caps the total time spent on one operation
+      (off by default: a long transfer is not a reason to give up).
+    - Every failed attempt is recorded for metrics.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 3.0,
+        max_delay: float = 120.0,
+        max_elapsed: float | None = None,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_elapsed = max_elapsed
+
+        self.records: list[AttemptRecord] = []
+        self._lock = threading.Lock()
+
+    # --------------------------------------------------------
+    # PUBLIC API
+    # --------------------------------------------------------
+
+    def start(
+        self,
+        operation: str,
+        max_attempts: int | None = None,
+        base_delay: float | None = None,
+        max_elapsed: float | None = None,
+    ) -> "RetryState":
+        """
+        Begin tracking retries for one operation.
+        Arguments override the policy defaults for this operation.
+        """
+        return RetryState(
+            policy=self,
+            operation=operation,
+            max_attempts=max_attempts or self.max_attempts,
+            base_delay=(
+                self.base_delay if base_delay is None else base_delay
+            ),
+            max_elapsed=(
+                self.max_elapsed if max_elapsed is None else max_elapsed
+            ),
+        )
+
+    def summary(self) -> dict[str, float]:
+        """
+        Aggregate metrics over all recorded attempts.
+        """
+        with self._lock:
+            records = list(self.records)
+
+        return {
+            "retries": sum(1 for r in records if not r.gave_up),
+            "gave_up": sum(1 for r in records if r.gave_up),
+            "retry_after_honoured": sum(
+                1 for r in records if r.retry_after is not None
+            ),
+            "total_wait": sum(r.wait for r in records),
+        }
+
+    # --------------------------------------------------------
+    # INTERNALS
+    # --------------------------------------------------------
+
+    def _record(self, record: AttemptRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+
+
+class RetryState:
+    """
+    Attempt counter and time budget for a single operation.
+
+    Usage:
+        retry = policy.start("listing 2025-09")
+        while True:
+            try:
+                ...
+                return result
+            except (...) as exc:
+                if not retry.backoff(exc):
+                    raise
+    """
+
+    def __init__(
+        self,
+        policy: RetryPolicy,
+        operation: str,
+        max_attempts: int,
+        base_delay: float,
+        max_elapsed: float | None,
+    ) -> None:
+        self.policy = policy
+        self.operation = operation
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_elapsed = max_elapsed
+
+        self.attempt = 1
+        self._streak = 0
+        self._started = time.monotonic()
+
+    def backoff(
+        self,
+        exc: BaseException | None = None,
+    ) -> bool:
+        """
+        Sleep before the next attempt. Returns False, without sleeping,
+        when attempts or the elapsed budget are exhausted.
+        """
+        elapsed = time.monotonic() - self._started
+        retry_after = _retry_after(exc)
+
+        wait = self._delay()
+
+        if retry_after is not None:
+            wait = max(wait, retry_after)
+
+        gave_up = self.attempt >= self.max_attempts or (
+            self.max_elapsed is not None
+            and elapsed + wait > self.max_elapsed
+        )
+
+        self.policy._record(
+            AttemptRecord(
+                operation=self.operation,
+                attempt=self.attempt,
+                error=type(exc).__name__ if exc is not None else "",
+                wait=0.0 if gave_up else wait,
+                elapsed=elapsed,
+                retry_after=retry_after,
+                gave_up=gave_up,
+            )
+        )
+
+        if gave_up:
+            return False
+
+        print(
+            f"[RETRY] {self.operation}: attempt "
+            f"{self.attempt}/{self.max_attempts} failed"
+            + (f" ({exc})" if exc is not None else "")
+            + f", waiting {wait:.1f}s"
+        )
+
+        time.sleep(wait)
+
+        self.attempt += 1
+        self._streak += 1
+        return True
+
+    def reset(self) -> None:
+        """
+        Restart the exponential curve after progress was made.
+        The attempt count and elapsed budget are kept.
+        """
+        self._streak = 0
+
+    def _delay(self) -> float:
+        ceiling = min(
+            self.policy.max_delay,
+            self.base_delay * (2 ** self._streak),
+        )
+        return random.uniform(ceiling / 2, ceiling)
+
+
+def _retry_after(exc: BaseException | None) -> float | None:
+    """
+    Seconds requested by a Retry-After header on an HTTP error.
+    """
+    if not isinstance(exc, urllib.error.HTTPError) or exc.headers is None:
+        return None
+
+    value = exc.headers.get("Retry-After")
+
+    if not value:
+        return None
+
+    value = value.strip()
+
+    if value.isdigit():
+        return float(value)
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,258 @@
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+import json
+import statistics
+import threading
+import urllib.error
+
+from app.pipeline.concurrency import ConcurrencyRound
+
+
+# Throughput histogram bucket edges, in MiB/s
+HISTOGRAM_EDGES = (1, 5, 10, 25, 50)
+
+MIB = 1024 * 1024
+
+
+# ============================================================
+# RECORD
+# ============================================================
+
+@dataclass(frozen=True)
+class TransferRecord:
+    """
+    Outcome of one attempt to fetch a file.
+
+    - status     : "ok", "cached" or "failed"
+    - bytes      : bytes received in this call (resumed bytes excluded)
+    - attempts   : HTTP requests issued, across segments and retries
+    - ttfb       : seconds to the first response headers
+    - http_status: last HTTP status seen (response or error)
+    - error      : class of the last error, if any
+    """
+    month: str
+    name: str
+    status: str
+    bytes: int
+    duration: float
+    attempts: int
+    throughput: float
+    ttfb: float | None
+    http_status: int | None
+    error: str | None
+    segments: int
+    finished_at: str
+
+
+class TransferProbe:
+    """
+    Counters for one file, updated by every request and segment
+    working on it (thread-safe). round is the download round of the
+    file's month, for per-month concurrency statistics.
+    """
+
+    def __init__(self, round: ConcurrencyRound | None = None) -> None:
+        self.round = round
+        self.bytes = 0
+        self.attempts = 0
+        self.segments = 1
+        self.ttfb: float | None = None
+        self.http_status: int | None = None
+        self.error: str | None = None
+
+        self._lock = threading.Lock()
+
+    def request(self) -> None:
+        with self._lock:
+            self.attempts += 1
+
+    def response(self, status: int, ttfb: float) -> None:
+        with self._lock:
+            self.http_status = status
+
+            if self.ttfb is None:
+                self.ttfb = ttfb
+
+    def received(self, count: int) -> None:
+        with self._lock:
+            self.bytes += count
+
+    def failed(self, exc: BaseException) -> None:
+        with self._lock:
+            self.error = type(exc).__name__
+
+            if isinstance(exc, urllib.error.HTTPError):
+                self.http_status = exc.code
+
+
+# ============================================================
+# TELEMETRY
+# ============================================================
+
+class DownloadTelemetry:
+    """
+    Collect per-file transfer records and append them to a JSONL run
+    log, one JSON object per line, so Receita's performance can be
+    compared across months and concurrency settings.
+    """
+
+    def __init__(self, log_path: Path | None = None) -> None:
+        self.log_path = log_path
+        self.records: list[TransferRecord] = []
+
+        self._lock = threading.Lock()
+
+    # --------------------------------------------------------
+    # PUBLIC API
+    # --------------------------------------------------------
+
+    def record(
+        self,
+        month: str,
+        name: str,
+        status: str,
+        probe: TransferProbe,
+        duration: float,
+    ) -> TransferRecord:
+        """
+        Turn a finished probe into a record and log it.
+        """
+        record = TransferRecord(
+            month=month,
+            name=name,
+            status=status,
+            bytes=probe.bytes,
+            duration=round(duration, 3),
+            attempts=probe.attempts,
+            throughput=(
+                round(probe.bytes / duration, 1) if duration > 0 else 0.0
+            ),
+            ttfb=round(probe.ttfb, 3) if probe.ttfb is not None else None,
+            http_status=probe.http_status,
+            error=probe.error,
+            segments=probe.segments,
+            finished_at=datetime.now(timezone.utc).isoformat(),
+        )
+
+        with self._lock:
+            self.records.append(record)
+
+            if self.log_path is not None:
+                self._append(record)
+
+        return record
+
+    def summary(self, month: str) -> None:
+        """
+        Print totals, throughput percentiles and a histogram for the
+        files of a month fetched in this run.
+        """
+        with self._lock:
+            records = [r for r in self.records if r.month == month]
+
+        if not records:
+            return
+
+        ok = [r for r in records if r.status == "ok"]
+        cached = sum(1 for r in records if r.status == "cached")
+        failed = sum(1 for r in records if r.status == "failed")
+
+        total_bytes = sum(r.bytes for r in records)
+        total_time = sum(r.duration for r in records)
+
+        print(
+            f"[TELEMETRY] {month}: {len(records)} transfers "
+            f"({len(ok)} ok, {cached} cached, {failed} failed), "
+            f"{total_bytes / MIB:.1f} MiB in {total_time:.1f}s"
+        )
+
+        throughputs = [r.throughput / MIB for r in ok if r.bytes]
+        ttfbs = [r.ttfb for r in records if r.ttfb is not None]
+
+        if throughputs:
+            print(
+                f"[TELEMETRY] Throughput per file: "
+                f"median {statistics.median(throughputs):.1f} MiB/s, "
+                f"min {min(throughputs):.1f}, max {max(throughputs):.1f}"
+            )
+
+        if ttfbs:
+            print(
+                f"[TELEMETRY] TTFB: "
+                f"median {statistics.median(ttfbs):.2f}s, "
+                f"p95 {_percentile(ttfbs, 0.95):.2f}s"
+            )
+
+        if throughputs:
+            self._print_histogram(throughputs)
+
+    def historical_throughput(self, limit: int = 200) -> float | None:
+        """
+        Per-file throughput (bytes/s) of the last successful downloads
+        in the run log, weighted by bytes so small files do not drag
+        it down. None without history.
+        """
+        if self.log_path is None or not self.log_path.exists():
+            return None
+
+        records: list[dict] = []
+
+        try:
+            with self.log_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+
+                    if record.get("status") == "ok" and record.get("bytes"):
+                        records.append(record)
+        except OSError:
+            return None
+
+        records = records[-limit:]
+        duration = sum(r["duration"] for r in records)
+
+        if not records or duration <= 0:
+            return None
+
+        return sum(r["bytes"] for r in records) / duration
+
+    # --------------------------------------------------------
+    # INTERNALS
+    # --------------------------------------------------------
+
+    def _append(self, record: TransferRecord) -> None:
+        try:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+
+            with self.log_path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(asdict(record)) + "\n")
+        except OSError as exc:
+            print(f"[TELEMETRY] Failed to write {self.log_path}: {exc}")
+
+    def _print_histogram(self, throughputs: list[float]) -> None:
+        labels = [f"<{HISTOGRAM_EDGES[0]}"]
+        labels += [
+            f"{low}-{high}"
+            for low, high in zip(HISTOGRAM_EDGES, HISTOGRAM_EDGES[1:])
+        ]
+        labels.append(f">={HISTOGRAM_EDGES[-1]}")
+
+        counts = [0] * len(labels)
+
+        for value in throughputs:
+            bucket = sum(1 for edge in HISTOGRAM_EDGES if value >= edge)
+            counts[bucket] += 1
+
+        print("[TELEMETRY] Throughput histogram (MiB/s):")
+
+        for label, count in zip(labels, counts):
+            print(f"[TELEMETRY]   {label:>6} {'#' * count} {count}")
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(fraction * len(ordered)))
+    return ordered[index]
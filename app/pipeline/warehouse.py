@@ -1,5 +1,23 @@
 import duckdb
 from pathlib import Path
+from typing import Iterator
+from zipfile import ZipFile
+import os
+import tempfile
+import threading
+
+from app.pipeline.datasets import (
+    DATASETS,
+    Dataset,
+    dataset_for_file,
+    dataset_for_zip,
+)
+from app.pipeline.encoding import TranscodeStats, transcode
+
+
+# Bump whenever the same source files would load into different rows
+# (column mapping, encoding, ...), so months loaded before are redone
+LOADER_VERSION = 1
 
 
 class CNPJWarehouse:
@@ -10,15 +28,34 @@ class CNPJWarehouse:
     DIM  : incremental
     CURR : current consolidated state per CNPJ
     LEADS: historical monthly snapshots
+
+    source selects where RAW and DIM rows are read from:
+    - "extracted": CSVs in extracted/<month> (default)
+    - "zip"      : CSV members streamed straight out of the ZIPs in
+                   raw/<month> through a named pipe, no files written,
+                   transcoded from Latin-1 to UTF-8 on the way
     """
 
     def __init__(
         self,
         duckdb_path: Path,
         extracted_dir: Path,
+        raw_dir: Path | None = None,
+        source: str = "extracted",
     ) -> None:
+        if source not in ("extracted", "zip"):
+            raise ValueError(f"Invalid warehouse source: {source}")
+
+        if source == "zip" and (raw_dir is None or not hasattr(os, "mkfifo")):
+            raise RuntimeError(
+                "[WAREHOUSE] Loading from ZIPs needs raw_dir and named "
+                "pipes (os.mkfifo)"
+            )
+
         self.duckdb_path = duckdb_path
         self.extracted_dir = extracted_dir
+        self.raw_dir = raw_dir
+        self.source = source
 
     def _connect(self) -> duckdb.DuckDBPyConnection:
         return duckdb.connect(str(self.duckdb_path))
@@ -35,50 +72,12 @@ class CNPJWarehouse:
         conn = self._connect()
 
         # -------------------------
-        # RAW
-        # -------------------------
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS estabelecimentos_raw (
-                cnpj_basico VARCHAR,
-                cnpj_ordem VARCHAR,
-                cnpj_dv VARCHAR,
-                nome_fantasia VARCHAR,
-                situacao_cadastral VARCHAR,
-                cnae_fiscal_principal VARCHAR,
-                cnae_fiscal_secundaria VARCHAR,
-                municipio VARCHAR,
-                uf VARCHAR,
-                correio_eletronico VARCHAR,
-                ddd1 VARCHAR,
-                telefone1 VARCHAR
-            )
-        """)
-
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS empresas_raw (
-                cnpj_basico VARCHAR,
-                razao_social VARCHAR,
-                porte_empresa VARCHAR,
-                natureza_juridica VARCHAR
-            )
-        """)
-
-        # -------------------------
-        # DIMENSIONS
+        # RAW + DIMENSIONS
         # -------------------------
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS dim_cnae (
-                codigo VARCHAR PRIMARY KEY,
-                descricao VARCHAR
-            )
-        """)
+        for dataset in DATASETS:
+            conn.execute(self._create_table_sql(dataset))
 
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS dim_municipio (
-                codigo VARCHAR PRIMARY KEY,
-                nome VARCHAR
-            )
-        """)
+        self._ensure_raw_source(conn)
 
         # -------------------------
         # CURRENT STATE
@@ -133,97 +132,108 @@ class CNPJWarehouse:
 
         print("[WAREHOUSE] Loading RAW tables")
 
-        conn.execute("DELETE FROM estabelecimentos_raw")
-        conn.execute("DELETE FROM empresas_raw")
+        self._reset_raw(conn)
 
-        conn.execute(
-            """
-            INSERT INTO estabelecimentos_raw
-            SELECT
-                cnpj_basico,
-                cnpj_ordem,
-                cnpj_dv,
-                nome_fantasia,
-                situacao_cadastral,
-                cnae_fiscal_principal,
-                cnae_fiscal_secundaria,
-                municipio,
-                uf,
-                correio_eletronico,
-                ddd1,
-                telefone1
-            FROM read_csv(
-                ?,
-                sep=';',
-                header=false,
-                ignore_errors=true,
-                columns={
-                    'cnpj_basico': 'VARCHAR',
-                    'cnpj_ordem': 'VARCHAR',
-                    'cnpj_dv': 'VARCHAR',
-                    'identificador_matriz_filial': 'VARCHAR',
-                    'nome_fantasia': 'VARCHAR',
-                    'situacao_cadastral': 'VARCHAR',
-                    'data_situacao_cadastral': 'VARCHAR',
-                    'motivo_situacao_cadastral': 'VARCHAR',
-                    'nome_cidade_exterior': 'VARCHAR',
-                    'pais': 'VARCHAR',
-                    'data_inicio_atividade': 'VARCHAR',
-                    'cnae_fiscal_principal': 'VARCHAR',
-                    'cnae_fiscal_secundaria': 'VARCHAR',
-                    'tipo_logradouro': 'VARCHAR',
-                    'logradouro': 'VARCHAR',
-                    'numero': 'VARCHAR',
-                    'complemento': 'VARCHAR',
-                    'bairro': 'VARCHAR',
-                    'cep': 'VARCHAR',
-                    'uf': 'VARCHAR',
-                    'municipio': 'VARCHAR',
-                    'ddd1': 'VARCHAR',
-                    'telefone1': 'VARCHAR',
-                    'ddd2': 'VARCHAR',
-                    'telefone2': 'VARCHAR',
-                    'ddd_fax': 'VARCHAR',
-                    'fax': 'VARCHAR',
-                    'correio_eletronico': 'VARCHAR',
-                    'situacao_especial': 'VARCHAR',
-                    'data_situacao_especial': 'VARCHAR'
-                }
-            )
-            """,
-            [str(base_path / "*.ESTABELE")],
-        )
-
-        conn.execute(
-            """
-            INSERT INTO empresas_raw
-            SELECT
-                cnpj_basico,
-                razao_social,
-                natureza_juridica,
-                porte_empresa
-            FROM read_csv(
-                ?,
-                sep=';',
-                header=false,
-                ignore_errors=true,
-                columns={
-                    'cnpj_basico': 'VARCHAR',
-                    'razao_social': 'VARCHAR',
-                    'natureza_juridica': 'VARCHAR',
-                    'qualificacao_responsavel': 'VARCHAR',
-                    'capital_social': 'VARCHAR',
-                    'porte_empresa': 'VARCHAR',
-                    'ente_federativo_responsavel': 'VARCHAR'
-                }
-            )
-            """,
-            [str(base_path / "*.EMPRECSV")],
-        )
+        if self.source == "zip":
+            self._insert_zips(conn, month, "raw")
+        else:
+            for dataset in DATASETS:
+                if dataset.kind == "raw":
+                    self._insert_extracted(conn, dataset, base_path)
 
         conn.close()
         print("[WAREHOUSE] RAW load completed")
 
+    def reset_raw(self) -> None:
+        """
+        Empty RAW staging tables before a file-by-file load.
+        """
+        conn = self._connect()
+        self._reset_raw(conn)
+        conn.close()
+
+    def _reset_raw(self, conn: duckdb.DuckDBPyConnection) -> None:
+        self._ensure_raw_source(conn)
+
+        conn.execute("DELETE FROM raw_source")
+
+        for dataset in DATASETS:
+            if dataset.kind == "raw":
+                conn.execute(f"DELETE FROM {dataset.table}")
+
+    # ============================================================
+    # RAW SOURCE
+    # ============================================================
+
+    def is_loaded(self, month: str, source_digest: str | None) -> bool:
+        """
+        True if RAW, DIM and leads were last built from exactly this
+        month and source digest by the current LOADER_VERSION, so
+        loading it again is a no-op.
+        """
+        if source_digest is None:
+            return False
+
+        return self._raw_source() == (month, source_digest, LOADER_VERSION)
+
+    def loaded_month(self) -> str | None:
+        """
+        Month RAW and leads_current were last built from, if any.
+        """
+        row = self._raw_source()
+
+        return row[0] if row is not None else None
+
+    def _raw_source(self) -> tuple | None:
+        if not self.duckdb_path.exists():
+            return None
+
+        # Only reads: plan must not create the database or its tables
+        conn = self._connect()
+
+        try:
+            return conn.execute(
+                "SELECT month, source_digest, loader_version FROM raw_source"
+            ).fetchone()
+        except duckdb.CatalogException:
+            # No raw_source yet
+            return None
+        finally:
+            conn.close()
+
+    def mark_loaded(self, month: str, source_digest: str | None) -> None:
+        """
+        Record which month and source digest the current state came from.
+        """
+        conn = self._connect()
+
+        try:
+            self._ensure_raw_source(conn)
+            conn.execute("DELETE FROM raw_source")
+
+            if source_digest is not None:
+                conn.execute(
+                    """
+                    INSERT INTO raw_source
+                        (month, source_digest, loaded_at, loader_version)
+                    VALUES (?, ?, now(), ?)
+                    """,
+                    [month, source_digest, LOADER_VERSION],
+                )
+        finally:
+            conn.close()
+
+    def _ensure_raw_source(self, conn: duckdb.DuckDBPyConnection) -> None:
+        # Single row: source of the data currently in RAW/leads_current
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS raw_source (
+                month VARCHAR,
+                source_digest VARCHAR,
+                loaded_at TIMESTAMP,
+                loader_version INTEGER
+            )
+        """)
+
     # ============================================================
     # DIM LOAD
     # ============================================================
@@ -234,46 +244,229 @@ class CNPJWarehouse:
 
         print("[WAREHOUSE] Loading dimensions")
 
-        conn.execute(
-            """
-            INSERT INTO dim_cnae
-            SELECT codigo, descricao
-            FROM read_csv(
-                ?,
-                sep=';',
-                header=false,
-                ignore_errors=true,
-                columns={
-                    'codigo': 'VARCHAR',
-                    'descricao': 'VARCHAR'
-                }
+        if self.source == "zip":
+            self._insert_zips(conn, month, "dim")
+        else:
+            for dataset in DATASETS:
+                if dataset.kind == "dim":
+                    self._insert_extracted(conn, dataset, base_path)
+
+        conn.close()
+        print("[WAREHOUSE] Dimension load completed")
+
+    # ============================================================
+    # FILE LOAD
+    # ============================================================
+
+    def load_file(self, path: Path) -> bool:
+        """
+        Load a single extracted CSV into its RAW or DIM table,
+        chosen by file suffix. RAW tables are not reset here.
+        Returns False for files no table consumes.
+        """
+        if dataset_for_zip(path.name) is not None:
+            return self.load_zip(path)
+
+        dataset = dataset_for_file(path)
+
+        if dataset is None:
+            return False
+
+        conn = self._connect()
+
+        try:
+            self._insert(conn, dataset, str(path))
+        finally:
+            conn.close()
+
+        print(f"[WAREHOUSE] Loaded {path.name}")
+        return True
+
+    def load_zip(self, zip_path: Path) -> bool:
+        """
+        Load every CSV member of a downloaded ZIP without extracting
+        it. RAW tables are not reset here.
+        Returns False if no member is consumed by a table.
+        """
+        conn = self._connect()
+
+        try:
+            members = list(self._zip_members(zip_path))
+
+            for dataset, member in members:
+                self._insert_member(conn, dataset, zip_path, member)
+        finally:
+            conn.close()
+
+        print(f"[WAREHOUSE] Loaded {zip_path.name}: {len(members)} members")
+        return bool(members)
+
+    # ============================================================
+    # ZIP LOAD
+    # ============================================================
+
+    def _insert_zips(
+        self,
+        conn: duckdb.DuckDBPyConnection,
+        month: str,
+        kind: str,
+    ) -> None:
+        """
+        Insert the members of raw/<month> ZIPs whose dataset is kind.
+        """
+        for zip_path in sorted((self.raw_dir / month).glob("*.zip")):
+            dataset = dataset_for_zip(zip_path.name)
+
+            if dataset is None or dataset.kind != kind:
+                continue
+
+            for member_dataset, member in self._zip_members(zip_path):
+                self._insert_member(conn, member_dataset, zip_path, member)
+
+    def _zip_members(self, zip_path: Path) -> Iterator[tuple[Dataset, str]]:
+        with ZipFile(zip_path, "r") as zf:
+            names = zf.namelist()
+
+        for name in names:
+            dataset = dataset_for_file(name)
+
+            if dataset is not None:
+                yield dataset, name
+
+    def _insert_member(
+        self,
+        conn: duckdb.DuckDBPyConnection,
+        dataset: Dataset,
+        zip_path: Path,
+        member: str,
+    ) -> None:
+        """
+        Insert one ZIP member: a thread inflates it into a named pipe
+        as UTF-8, and read_csv consumes the pipe. Runs in a
+        transaction, so a member that fails to inflate half way leaves
+        no rows behind.
+        """
+        with tempfile.TemporaryDirectory(prefix="cnpj-pipe-") as tmp_dir:
+            fifo = Path(tmp_dir) / "member.csv"
+            os.mkfifo(fifo)
+
+            stats: list[TranscodeStats] = []
+            errors: list[BaseException] = []
+            writer = threading.Thread(
+                target=_stream_member,
+                args=(zip_path, member, fifo, stats, errors),
+                daemon=True,
             )
-            WHERE codigo NOT IN (SELECT codigo FROM dim_cnae)
-            """,
-            [str(base_path / "*.CNAECSV")],
+            writer.start()
+
+            conn.begin()
+
+            try:
+                self._insert(conn, dataset, str(fifo))
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                _release_pipe(fifo, writer)
+
+            if errors:
+                conn.rollback()
+                raise RuntimeError(
+                    f"[WAREHOUSE] Failed to read {member} "
+                    f"from {zip_path.name}"
+                ) from errors[0]
+
+            conn.commit()
+
+        if stats:
+            print(
+                f"[WAREHOUSE] {member}: {stats[0].rows} rows, "
+                f"{stats[0].rescued} rescued from Latin-1"
+            )
+
+    # ============================================================
+    # INSERTS
+    # ============================================================
+
+    def _insert_extracted(
+        self,
+        conn: duckdb.DuckDBPyConnection,
+        dataset: Dataset,
+        base_path: Path,
+    ) -> None:
+        """
+        Insert a dataset's files from extracted/<month>: Parquet copies
+        and/or CSVs, whichever the extractor left there.
+        """
+        patterns = [
+            pattern
+            for pattern in (
+                f"*.{dataset.csv_suffix}.parquet",
+                f"*.{dataset.csv_suffix}",
+            )
+            if any(base_path.glob(pattern))
+        ]
+
+        # No files at all: let read_csv report it as before
+        for pattern in patterns or [f"*.{dataset.csv_suffix}"]:
+            self._insert(conn, dataset, str(base_path / pattern))
+
+    def _insert(
+        self,
+        conn: duckdb.DuckDBPyConnection,
+        dataset: Dataset,
+        source: str,
+    ) -> None:
+        """
+        Insert CSV or Parquet file(s) matching source into the dataset
+        table. DIM rows whose key already exists are skipped.
+        """
+        keep = ", ".join(dataset.keep)
+        columns = ", ".join(
+            f"'{column}': 'VARCHAR'" for column in dataset.columns
         )
 
-        conn.execute(
-            """
-            INSERT INTO dim_municipio
-            SELECT codigo, nome
-            FROM read_csv(
+        where = ""
+
+        if dataset.kind == "dim":
+            where = (
+                f"WHERE {dataset.key} NOT IN "
+                f"(SELECT {dataset.key} FROM {dataset.table})"
+            )
+
+        reader = f"""read_csv(
                 ?,
                 sep=';',
                 header=false,
                 ignore_errors=true,
-                columns={
-                    'codigo': 'VARCHAR',
-                    'nome': 'VARCHAR'
-                }
-            )
-            WHERE codigo NOT IN (SELECT codigo FROM dim_municipio)
+                columns={{{columns}}}
+            )"""
+
+        # Parquet from the extractor: already UTF-8 with column names
+        if source.lower().endswith(".parquet"):
+            reader = "read_parquet(?)"
+
+        conn.execute(
+            f"""
+            INSERT INTO {dataset.table} ({keep})
+            SELECT {keep}
+            FROM {reader}
+            {where}
             """,
-            [str(base_path / "*.MUNICCSV")],
+            [source],
         )
 
-        conn.close()
-        print("[WAREHOUSE] Dimension load completed")
+    def _create_table_sql(self, dataset: Dataset) -> str:
+        columns = [
+            f"{column} VARCHAR"
+            + (" PRIMARY KEY" if column == dataset.key else "")
+            for column in dataset.keep
+        ]
+
+        return (
+            f"CREATE TABLE IF NOT EXISTS {dataset.table} "
+            f"({', '.join(columns)})"
+        )
 
     # ============================================================
     # PRODUCT
@@ -358,3 +551,40 @@ class CNPJWarehouse:
 
         conn.close()
         print("[WAREHOUSE] Leads build completed")
+
+
+# ============================================================
+# NAMED PIPES
+# ============================================================
+
+def _stream_member(
+    zip_path: Path,
+    member: str,
+    fifo: Path,
+    stats: list[TranscodeStats],
+    errors: list[BaseException],
+) -> None:
+    """
+    Inflate a ZIP member into a named pipe as UTF-8 (writer side).
+    """
+    try:
+        with ZipFile(zip_path, "r") as zf, zf.open(member) as src:
+            with open(fifo, "wb") as dst:
+                stats.append(transcode(src, dst))
+    except BrokenPipeError:
+        # Reader gone: its own error (or none) is what matters
+        pass
+    except Exception as exc:
+        errors.append(exc)
+
+
+def _release_pipe(fifo: Path, writer: threading.Thread) -> None:
+    """
+    Unblock a writer still waiting on the pipe (the reader failed
+    before opening it, or stopped early) and wait for it to finish.
+    """
+    if writer.is_alive():
+        fd = os.open(fifo, os.O_RDONLY | os.O_NONBLOCK)
+        os.close(fd)
+
+    writer.join()
@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator
+import xml.etree.ElementTree as ET
+
+
+# ============================================================
+# PROPFIND
+# ============================================================
+
+@dataclass(frozen=True)
+class DavEntry:
+    """
+    One <d:response> of a PROPFIND multistatus.
+
+    props maps DAV property names (e.g. "getetag") to their text;
+    properties the server did not return are absent.
+    """
+    href: str
+    props: dict[str, str]
+
+    @property
+    def name(self) -> str:
+        """
+        Last path segment of the href (file or folder name).
+        """
+        return self.href.rstrip("/").split("/")[-1]
+
+
+def propfind_body(*props: str) -> bytes:
+    """
+    PROPFIND request body asking only for the given DAV properties.
+    """
+    names = "".join(f"<d:{prop}/>" for prop in props)
+
+    return (
+        '<?xml version="1.0"?>'
+        '<d:propfind xmlns:d="DAV:">'
+        f"<d:prop>{names}</d:prop>"
+        "</d:propfind>"
+    ).encode()
+
+
+def iter_propfind(
+    stream: BinaryIO,
+    chunk_size: int = 64 * 1024,
+) -> Iterator[DavEntry]:
+    """
+    Parse a multistatus body incrementally, yielding each response as
+    soon as it is complete. Parsed responses are dropped from the tree,
+    so memory stays flat however many entries the folder holds.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root: list[ET.Element] = []
+
+    while True:
+        chunk = stream.read(chunk_size)
+
+        if not chunk:
+            break
+
+        parser.feed(chunk)
+        yield from _drain(parser, root)
+
+    parser.close()
+    yield from _drain(parser, root)
+
+
+def _drain(
+    parser: ET.XMLPullParser,
+    root: list[ET.Element],
+) -> Iterator[DavEntry]:
+    for event, elem in parser.read_events():
+        if event == "start":
+            if not root:
+                root.append(elem)
+            continue
+
+        if elem.tag != "{DAV:}response":
+            continue
+
+        entry = _entry(elem)
+
+        # Responses are direct children of <d:multistatus>
+        elem.clear()
+
+        try:
+            root[0].remove(elem)
+        except ValueError:
+            pass
+
+        if entry is not None:
+            yield entry
+
+
+def _entry(response: ET.Element) -> DavEntry | None:
+    href = response.find("{DAV:}href")
+
+    if href is None or not href.text:
+        return None
+
+    props: dict[str, str] = {}
+
+    for prop in response.iterfind("{DAV:}propstat/{DAV:}prop/*"):
+        if prop.text and prop.text.strip():
+            props[prop.tag.split("}", 1)[-1]] = prop.text.strip()
+
+    return DavEntry(href=href.text.strip(), props=props)
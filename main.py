@@ -2,10 +2,71 @@ import sys
 from pathlib import Path
 
 from app.config import get_settings
+from app.pipeline.bandwidth import BandwidthLimiter
+from app.pipeline.cache import ZipCache
+from app.pipeline.disk import DiskGuard, DiskUsageMonitor
 from app.pipeline.download import CNPJDownloader
 from app.pipeline.extract import CNPJExtractor
+from app.pipeline.manifest import MonthManifest
+from app.pipeline.telemetry import DownloadTelemetry
 from app.pipeline.warehouse import CNPJWarehouse
+from app.orchestrator.backfill import CNPJBackfill
 from app.orchestrator.find import CNPJMonthFinder
+from app.orchestrator.plan import CNPJPlanner
+from app.orchestrator.stream import CNPJStreamingPipeline
+
+
+def load_month(
+    warehouse: CNPJWarehouse,
+    raw_dir: Path,
+    month: str,
+) -> None:
+    """
+    Load a month unless the warehouse was last built from the same
+    downloaded files (same manifest digests).
+    """
+    source_digest = MonthManifest(raw_dir / month).month_digest()
+
+    if warehouse.is_loaded(month, source_digest):
+        print(f"[MAIN] Month {month} unchanged since last load, skipping")
+        return
+
+    warehouse.load_raw(month)
+    warehouse.load_dim(month)
+    warehouse.build_leads(month)
+
+    warehouse.mark_loaded(month, source_digest)
+
+
+def is_month_done(
+    downloader: CNPJDownloader,
+    warehouse: CNPJWarehouse,
+    month: str,
+) -> bool:
+    """
+    True if the warehouse holds this month and no listed ZIP changed
+    since, even if its files were cleaned up after loading.
+    """
+    source_digest = MonthManifest(
+        downloader.raw_dir / month
+    ).month_digest()
+
+    return (
+        warehouse.is_loaded(month, source_digest)
+        and downloader.is_month_current(month)
+    )
+
+
+def cli_option(name: str) -> str | None:
+    """
+    Value following --name on the command line, if any.
+    """
+    flag = f"--{name}"
+
+    if flag in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(flag) + 1]
+
+    return None
 
 
 def main() -> None:
@@ -26,20 +87,84 @@ def main() -> None:
     downloader = CNPJDownloader(
         public_token=settings.nextcloud_public_token,
         raw_dir=raw_dir,
+        max_workers=(
+            min(2, settings.download_workers)
+            if settings.download_adaptive
+            else settings.download_workers
+        ),
+        adaptive_concurrency=settings.download_adaptive,
+        max_adaptive_workers=settings.download_workers,
+        segments_per_file=settings.download_segments,
+        min_segment_size=settings.download_min_segment * 1024 * 1024,
+        bandwidth=BandwidthLimiter.from_config(
+            rate=settings.download_rate_limit,
+            schedule=settings.download_rate_schedule,
+        ),
+        cache=(
+            ZipCache(settings.zip_cache_dir)
+            if settings.zip_cache_dir is not None
+            else None
+        ),
+        priority=settings.download_priority,
+        telemetry=DownloadTelemetry(settings.download_log),
     )
 
     extractor = CNPJExtractor(
         raw_dir=raw_dir,
         extracted_dir=extracted_dir,
+        processes=settings.extract_processes,
+        parquet=settings.extract_parquet,
     )
 
     warehouse = CNPJWarehouse(
         duckdb_path=duckdb_path,
         extracted_dir=extracted_dir,
+        raw_dir=raw_dir,
+        source=settings.load_source,
     )
 
     finder = CNPJMonthFinder(
         public_token=settings.nextcloud_public_token,
+        state_path=settings.finder_state,
+        deep_listing=settings.finder_deep_listing,
+    )
+
+    disk = DiskGuard(
+        raw_dir=raw_dir,
+        extracted_dir=extracted_dir,
+        duckdb_path=duckdb_path,
+        # Loading straight from the ZIPs writes no CSVs
+        expansion_ratio=(
+            0.0
+            if settings.load_source == "zip"
+            else settings.disk_expansion_ratio
+        ),
+        db_ratio=settings.disk_db_ratio,
+        cleanup=settings.disk_cleanup,
+    )
+
+    planner = CNPJPlanner(
+        downloader=downloader,
+        extractor=extractor,
+        warehouse=warehouse,
+        disk=disk,
+    )
+
+    streaming = CNPJStreamingPipeline(
+        downloader=downloader,
+        extractor=extractor,
+        warehouse=warehouse,
+        disk=disk,
+    )
+
+    backfill = CNPJBackfill(
+        downloader=downloader,
+        extractor=extractor,
+        warehouse=warehouse,
+        finder=finder,
+        disk=disk,
+        state_path=settings.data_dir / "state/backfill.json",
+        month_workers=settings.backfill_workers,
     )
 
     # -------------------------
@@ -57,14 +182,32 @@ def main() -> None:
     # ---------------------------------
     # Full pipeline requires schema
     # ---------------------------------
-    if cmd == "full":
+    if cmd in ("full", "stream", "backfill"):
         print("[MAIN] Running setup")
         warehouse.setup()
 
+    # ---------------------------------
+    # Backfill: explicit month range
+    # ---------------------------------
+    if cmd == "backfill":
+        start = cli_option("from")
+        end = cli_option("to") or settings.cnpj_month
+
+        if start is None:
+            raise SystemExit(
+                "Usage: main.py backfill --from YYYY-MM [--to YYYY-MM]"
+            )
+
+        with DiskUsageMonitor(settings.data_dir):
+            backfill.run(start, end)
+
+        print("[MAIN] Done")
+        return
+
     # ---------------------------------
     # Finder decides which months exist
     # ---------------------------------
-    months = finder.get_updated_months()
+    months = finder.get_updated_months(read_only=cmd == "plan")
 
     if not months:
         print("[MAIN] No updated months found")
@@ -72,36 +215,74 @@ def main() -> None:
 
     print(f"[MAIN] Months to process: {months}")
 
+    # Reuse file listings the finder already fetched
+    for month in months:
+        listing = finder.month_listing(month)
+
+        if listing:
+            downloader.seed_listing(month, listing)
+
+    # ---------------------------------
+    # Dry run: what would be done
+    # ---------------------------------
+    if cmd == "plan":
+        planner.print_plan(
+            months,
+            throughput=downloader.telemetry.historical_throughput(),
+        )
+        return
+
     # -------------------------
     # Execute pipeline per month
     # -------------------------
-    for month in months:
-        print(f"[MAIN] Processing month {month}")
+    with DiskUsageMonitor(settings.data_dir):
+        for month in months:
+            print(f"[MAIN] Processing month {month}")
+
+            if cmd in ("full", "stream") and is_month_done(
+                downloader, warehouse, month
+            ):
+                print(f"[MAIN] Month {month} already loaded, skipping")
+                finder.mark_processed(month)
+                continue
+
+            if cmd in ("download", "full", "stream"):
+                disk.preflight(
+                    month,
+                    {
+                        remote.name: remote.size
+                        for remote in downloader.list_month(month)
+                    },
+                )
+
+            if cmd == "download":
+                result = downloader.download_month(month)
+                print(f"Downloaded: {len(result.downloaded)}")
+                print(f"Skipped: {len(result.skipped)}")
+
+            elif cmd == "extract":
+                result = extractor.extract_month(month)
+                print(f"Extracted files: {len(result.extracted_files)}")
 
-        if cmd == "download":
-            result = downloader.download_month(month)
-            print(f"Downloaded: {len(result.downloaded)}")
-            print(f"Skipped: {len(result.skipped)}")
+            elif cmd == "load":
+                load_month(warehouse, raw_dir, month)
 
-        elif cmd == "extract":
-            result = extractor.extract_month(month)
-            print(f"Extracted files: {len(result.extracted_files)}")
+            elif cmd == "full":
+                downloader.download_month(month)
 
-        elif cmd == "load":
-            warehouse.load_raw(month)
-            warehouse.load_dim(month)
-            warehouse.build_leads(month)
+                if warehouse.source != "zip":
+                    extractor.extract_month(month)
 
-        elif cmd == "full":
-            downloader.download_month(month)
-            extractor.extract_month(month)
+                load_month(warehouse, raw_dir, month)
+                disk.release_month(month)
+                finder.mark_processed(month)
 
-            warehouse.load_raw(month)
-            warehouse.load_dim(month)
-            warehouse.build_leads(month)
+            elif cmd == "stream":
+                streaming.run_month(month)
+                finder.mark_processed(month)
 
-        else:
-            raise SystemExit(f"Unknown command: {cmd}")
+            else:
+                raise SystemExit(f"Unknown command: {cmd}")
 
     print("[MAIN] Done")
 
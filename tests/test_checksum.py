@@ -0,0 +1,78 @@
+"""
+Block digests computed while streaming segments match digest_file.
+
+Run with: python -m pytest tests
+"""
+from pathlib import Path
+from unittest import mock
+import os
+import random
+import tempfile
+import unittest
+
+from app.pipeline import checksum
+from app.pipeline.checksum import BlockHasher, combine_blocks, digest_file
+
+
+BLOCK = 1000
+
+
+# ============================================================
+# TESTS
+# ============================================================
+
+@mock.patch.object(checksum, "BLOCK_SIZE", BLOCK)
+class BlockDigestTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data = os.urandom(7 * BLOCK + 350)
+        self.path = Path(self.tmp.name) / "file.zip"
+        self.path.write_bytes(self.data)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _stream(self, start: int, end: int) -> dict[int, bytes]:
+        """
+        Block digests of bytes [start, end) fed in uneven chunks.
+        """
+        hasher = BlockHasher(start, block_size=BLOCK)
+
+        for offset in range(start, end, 333):
+            hasher.update(self.data[offset:min(end, offset + 333)])
+
+        return hasher.finish(at_end=end == len(self.data))
+
+    def test_single_stream_matches_file(self) -> None:
+        blocks = self._stream(0, len(self.data))
+
+        self.assertEqual(combine_blocks(blocks), digest_file(self.path))
+
+    def test_segments_out_of_order_match_file(self) -> None:
+        expected = digest_file(self.path)
+        size = len(self.data)
+
+        # Even splits, as _plan_segments makes them: not block aligned
+        for count in (2, 3, 4, 7):
+            step = size // count
+            bounds = [index * step for index in range(count)] + [size]
+            segments = list(zip(bounds, bounds[1:]))
+            random.Random(count).shuffle(segments)
+
+            blocks: dict[int, bytes] = {}
+
+            for start, end in segments:
+                blocks.update(self._stream(start, end))
+
+            with self.subTest(segments=count):
+                self.assertEqual(digest_file(self.path, blocks), expected)
+
+    def test_blocks_across_boundaries_are_left_out(self) -> None:
+        blocks = self._stream(BLOCK // 2, 3 * BLOCK + 10)
+
+        self.assertEqual(sorted(blocks), [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
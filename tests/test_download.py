@@ -0,0 +1,206 @@
+"""
+Downloader against a local stand-in for Receita's WebDAV.
+
+Run with: python -m pytest tests
+"""
+from pathlib import Path
+import hashlib
+import http.server
+import os
+import socket
+import tempfile
+import threading
+import unittest
+import urllib.error
+
+from app.pipeline.download import CNPJDownloader
+from app.pipeline.manifest import MonthManifest
+from app.pipeline.retry import RetryPolicy
+
+
+MONTH = "2025-07"
+
+SEGMENTS = 4
+
+FILES = {
+    "Estabelecimentos0.zip": os.urandom(SEGMENTS * 1024 * 1024 + 123),
+    "Empresas0.zip": os.urandom(1024 * 1024 + 7),
+    "Cnaes.zip": os.urandom(4096),
+}
+
+
+# ============================================================
+# FAKE WEBDAV
+# ============================================================
+
+class FakeWebDAV(http.server.BaseHTTPRequestHandler):
+    """
+    PROPFIND listing and (ranged) GETs for the files of one month.
+    """
+    protocol_version = "HTTP/1.1"
+
+    connections = 0
+    lock = threading.Lock()
+
+    # Ranged GETs wait here until all segments are in flight at once
+    segments = threading.Barrier(SEGMENTS, timeout=10)
+
+    def setup(self) -> None:
+        super().setup()
+
+        with FakeWebDAV.lock:
+            FakeWebDAV.connections += 1
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_PROPFIND(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        prefix = f"/public.php/webdav/Dados/Cadastros/CNPJ/{MONTH}"
+        responses = [f"<d:response><d:href>{prefix}/</d:href></d:response>"]
+
+        for name, data in FILES.items():
+            responses.append(
+                f"<d:response><d:href>{prefix}/{name}</d:href>"
+                f"<d:propstat><d:prop>"
+                f"<d:getcontentlength>{len(data)}</d:getcontentlength>"
+                f'<d:getetag>"{hashlib.md5(data).hexdigest()}"</d:getetag>'
+                f"<d:getlastmodified>Mon, 06 Oct 2025 10:00:00 GMT"
+                f"</d:getlastmodified>"
+                f"</d:prop></d:propstat></d:response>"
+            )
+
+        body = (
+            '<?xml version="1.0"?><d:multistatus xmlns:d="DAV:">'
+            + "".join(responses)
+            + "</d:multistatus>"
+        ).encode()
+
+        self.send_response(207)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        data = FILES[self.path.rsplit("/", 1)[-1]]
+        start, end, status = 0, len(data) - 1, 200
+
+        if self.headers.get("Range"):
+            first, last = self.headers["Range"].split("=")[1].split("-")
+            start = int(first)
+            end = int(last) if last else len(data) - 1
+            status = 206
+
+            # Segments of the large file, not the one-byte range probe
+            if len(data) > SEGMENTS * 1024 * 1024 and end > start:
+                FakeWebDAV.segments.wait()
+
+        body = data[start:end + 1]
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(len(body)))
+
+        if status == 206:
+            self.send_header(
+                "Content-Range", f"bytes {start}-{end}/{len(data)}"
+            )
+
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# ============================================================
+# TESTS
+# ============================================================
+
+class DownloaderTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", 0), FakeWebDAV
+        )
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+        cls.base = (
+            f"http://127.0.0.1:{cls.server.server_port}/public.php/webdav"
+        )
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw_dir = Path(self.tmp.name) / "raw"
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _downloader(self, base: str) -> CNPJDownloader:
+        downloader = CNPJDownloader(
+            public_token="token",
+            raw_dir=self.raw_dir,
+            max_workers=1,
+            segments_per_file=SEGMENTS,
+            min_segment_size=1024 * 1024,
+            retry_policy=RetryPolicy(max_attempts=3, base_delay=0.01),
+        )
+        downloader.WEBDAV_BASE = base
+        return downloader
+
+    def test_downloads_month_over_pooled_connections(self) -> None:
+        FakeWebDAV.connections = 0
+        downloader = self._downloader(self.base)
+
+        result = downloader.download_month(MONTH)
+        segments = {
+            record.name: record.segments
+            for record in downloader.telemetry.records
+        }
+
+        self.assertEqual(len(result.downloaded), len(FILES))
+
+        manifest = MonthManifest(self.raw_dir / MONTH)
+
+        for name, data in FILES.items():
+            self.assertEqual((self.raw_dir / MONTH / name).read_bytes(), data)
+            self.assertTrue(manifest.get(name)["digest"])
+
+        self.assertEqual(
+            segments,
+            {"Estabelecimentos0.zip": SEGMENTS, "Empresas0.zip": 1,
+             "Cnaes.zip": 1},
+        )
+
+        # One file at a time: the listing, the range probe and the
+        # single-stream files reuse a connection opened for the
+        # segments, which are all in flight together
+        self.assertEqual(FakeWebDAV.connections, SEGMENTS)
+
+    def test_connection_errors_are_retried(self) -> None:
+        base = f"http://127.0.0.1:{_free_port()}/public.php/webdav"
+        downloader = self._downloader(base)
+
+        with self.assertRaises(urllib.error.URLError):
+            downloader._download_file(
+                downloader._build_file_url(MONTH, "Cnaes.zip"),
+                self.raw_dir / MONTH / "Cnaes.zip",
+                expected_size=len(FILES["Cnaes.zip"]),
+            )
+
+        self.assertEqual(len(downloader.retry_policy.records), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
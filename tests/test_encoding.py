@@ -0,0 +1,69 @@
+"""
+Latin-1 to UTF-8 transcoding and its row counts.
+
+Run with: python -m pytest tests
+"""
+import io
+import unittest
+
+from app.pipeline.encoding import transcode
+
+
+LINES = [
+    '"1";"JOSÉ DA SILVA";"SÃO PAULO"',
+    '"2";"ACME LTDA";"CAMPINAS"',
+    '"3";"AÇOUGUE BOM";"MACEIÓ"',
+    '"4";"PADARIA";"SANTOS"',
+]
+
+
+def _run(source: bytes, chunk_size: int) -> tuple[bytes, int, int]:
+    dst = io.BytesIO()
+    stats = transcode(io.BytesIO(source), dst, chunk_size=chunk_size)
+    return dst.getvalue(), stats.rows, stats.rescued
+
+
+# ============================================================
+# TESTS
+# ============================================================
+
+class TranscodeTest(unittest.TestCase):
+
+    def test_latin1_rows_are_transcoded_and_counted(self) -> None:
+        text = "\n".join(LINES) + "\n"
+
+        # Chunk boundaries inside lines, characters and at newlines
+        for chunk_size in (1, 3, 7, 31, 1024 * 1024):
+            with self.subTest(chunk_size=chunk_size):
+                output, rows, rescued = _run(
+                    text.encode("latin-1"), chunk_size
+                )
+
+                self.assertEqual(output, text.encode("utf-8"))
+                self.assertEqual(rows, 4)
+                self.assertEqual(rescued, 2)
+
+    def test_last_line_without_newline(self) -> None:
+        text = "\n".join(LINES)
+
+        for chunk_size in (5, 1024 * 1024):
+            with self.subTest(chunk_size=chunk_size):
+                output, rows, rescued = _run(
+                    text.encode("latin-1"), chunk_size
+                )
+
+                self.assertEqual(output, text.encode("utf-8"))
+                self.assertEqual(rows, 4)
+                self.assertEqual(rescued, 2)
+
+    def test_ascii_and_utf8_rows_are_not_rescued(self) -> None:
+        ascii_text = '"1";"ACME"\n"2";"PADARIA"\n'
+        self.assertEqual(_run(ascii_text.encode(), 4)[1:], (2, 0))
+
+        # Already valid UTF-8: read_csv never dropped these
+        utf8_text = "\n".join(LINES) + "\n"
+        self.assertEqual(_run(utf8_text.encode("utf-8"), 1 << 20)[1:], (4, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()